@@ -12,7 +12,7 @@ from app.core.config import settings
 from app.db.base import Base
 
 # ✅ IMPORTANT: Import models so metadata is registered
-from app.models import user, project, agent, prompt, conversation, message  # noqa: F401
+from app.models import user, project, agent, prompt, conversation, message, outbound_email, file, usage, archive, deletion_job  # noqa: F401
 
 
 # Alembic Config object (read from alembic.ini)
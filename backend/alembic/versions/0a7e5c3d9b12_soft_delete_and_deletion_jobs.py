@@ -0,0 +1,50 @@
+"""soft delete for agents and projects, background deletion jobs
+
+Revision ID: 0a7e5c3d9b12
+Revises: f3b6d2a8c915
+Create Date: 2026-10-18 18:14:05.226719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7e5c3d9b12'
+down_revision: Union[str, None] = 'f3b6d2a8c915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('agents', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('projects', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_table('deletion_jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('target_id', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('deleted_messages', sa.Integer(), nullable=False),
+    sa.Column('deleted_conversations', sa.Integer(), nullable=False),
+    sa.Column('deleted_prompts', sa.Integer(), nullable=False),
+    sa.Column('deleted_agents', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_deletion_jobs_status_next_attempt_at', 'deletion_jobs', ['status', 'next_attempt_at'], unique=False)
+    op.create_index(op.f('ix_deletion_jobs_user_id'), 'deletion_jobs', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_deletion_jobs_user_id'), table_name='deletion_jobs')
+    op.drop_index('ix_deletion_jobs_status_next_attempt_at', table_name='deletion_jobs')
+    op.drop_table('deletion_jobs')
+    op.drop_column('projects', 'deleted_at')
+    op.drop_column('agents', 'deleted_at')
@@ -0,0 +1,29 @@
+"""messages (conversation_id, created_at) index
+
+Revision ID: 3f9c2a7d41b8
+Revises: 61738b049655
+Create Date: 2026-10-18 09:12:04.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d41b8'
+down_revision: Union[str, None] = '61738b049655'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the composite index serves conversation_id lookups too
+    op.create_index('ix_messages_conversation_id_created_at', 'messages', ['conversation_id', 'created_at'], unique=False)
+    op.drop_index(op.f('ix_messages_conversation_id'), table_name='messages')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_messages_conversation_id'), 'messages', ['conversation_id'], unique=False)
+    op.drop_index('ix_messages_conversation_id_created_at', table_name='messages')
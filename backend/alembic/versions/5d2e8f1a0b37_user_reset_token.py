@@ -0,0 +1,30 @@
+"""user reset token columns
+
+Revision ID: 5d2e8f1a0b37
+Revises: c47a19e3f2d5
+Create Date: 2026-10-18 11:31:52.667403
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8f1a0b37'
+down_revision: Union[str, None] = 'c47a19e3f2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('reset_token', sa.String(), nullable=True))
+    op.add_column('users', sa.Column('reset_token_expires', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_users_reset_token'), 'users', ['reset_token'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_reset_token'), table_name='users')
+    op.drop_column('users', 'reset_token_expires')
+    op.drop_column('users', 'reset_token')
@@ -0,0 +1,41 @@
+"""outbound email queue
+
+Revision ID: 7c0f4e2b9a61
+Revises: e6a3b9c8d104
+Create Date: 2026-10-18 13:20:11.804562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c0f4e2b9a61'
+down_revision: Union[str, None] = 'e6a3b9c8d104'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outbound_emails',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('recipients', sa.String(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('subtype', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbound_emails_status_next_attempt_at', 'outbound_emails', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbound_emails_status_next_attempt_at', table_name='outbound_emails')
+    op.drop_table('outbound_emails')
@@ -0,0 +1,30 @@
+"""conversation rolling summary
+
+Revision ID: 8b1e5d0c6a92
+Revises: 3f9c2a7d41b8
+Create Date: 2026-10-18 10:02:41.530772
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e5d0c6a92'
+down_revision: Union[str, None] = '3f9c2a7d41b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('summary', sa.Text(), server_default='', nullable=False))
+    op.add_column('conversations', sa.Column('summary_message_id', sa.String(), nullable=True))
+    op.add_column('conversations', sa.Column('summary_message_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('conversations', 'summary_message_at')
+    op.drop_column('conversations', 'summary_message_id')
+    op.drop_column('conversations', 'summary')
@@ -0,0 +1,43 @@
+"""content-addressed file registry
+
+Revision ID: a91d6c3e5f28
+Revises: 7c0f4e2b9a61
+Create Date: 2026-10-18 14:07:45.319840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91d6c3e5f28'
+down_revision: Union[str, None] = '7c0f4e2b9a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('files',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('sha256', sa.String(), nullable=False),
+    sa.Column('owner_id', sa.String(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('mime_type', sa.String(), nullable=False),
+    sa.Column('provider_file_id', sa.String(), nullable=True),
+    sa.Column('blob_path', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'sha256', name='uq_files_owner_id_sha256')
+    )
+    op.create_index(op.f('ix_files_sha256'), 'files', ['sha256'], unique=False)
+    op.create_index(op.f('ix_files_provider_file_id'), 'files', ['provider_file_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_files_provider_file_id'), table_name='files')
+    op.drop_index(op.f('ix_files_sha256'), table_name='files')
+    op.drop_table('files')
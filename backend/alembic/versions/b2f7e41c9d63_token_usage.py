@@ -0,0 +1,58 @@
+"""token usage per message and hourly rollups
+
+Revision ID: b2f7e41c9d63
+Revises: a91d6c3e5f28
+Create Date: 2026-10-18 15:02:11.604127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f7e41c9d63'
+down_revision: Union[str, None] = 'a91d6c3e5f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('model', sa.String(), nullable=True))
+    op.add_column('messages', sa.Column('prompt_tokens', sa.Integer(), nullable=True))
+    op.add_column('messages', sa.Column('completion_tokens', sa.Integer(), nullable=True))
+    op.add_column('messages', sa.Column('cached_tokens', sa.Integer(), nullable=True))
+    op.add_column('messages', sa.Column('latency_ms', sa.Integer(), nullable=True))
+    op.add_column('messages', sa.Column('ttft_ms', sa.Integer(), nullable=True))
+    op.create_table('usage_hourly',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('project_id', sa.String(), nullable=False),
+    sa.Column('agent_id', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('requests', sa.Integer(), nullable=False),
+    sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('completion_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('cached_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('latency_ms', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('hour', 'user_id', 'project_id', 'agent_id', 'model', name='uq_usage_hourly_grain')
+    )
+    op.create_index('ix_usage_hourly_user_id_hour', 'usage_hourly', ['user_id', 'hour'], unique=False)
+    op.create_index('ix_usage_hourly_project_id_hour', 'usage_hourly', ['project_id', 'hour'], unique=False)
+    op.create_index('ix_usage_hourly_agent_id_hour', 'usage_hourly', ['agent_id', 'hour'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_usage_hourly_agent_id_hour', table_name='usage_hourly')
+    op.drop_index('ix_usage_hourly_project_id_hour', table_name='usage_hourly')
+    op.drop_index('ix_usage_hourly_user_id_hour', table_name='usage_hourly')
+    op.drop_table('usage_hourly')
+    op.drop_column('messages', 'ttft_ms')
+    op.drop_column('messages', 'latency_ms')
+    op.drop_column('messages', 'cached_tokens')
+    op.drop_column('messages', 'completion_tokens')
+    op.drop_column('messages', 'prompt_tokens')
+    op.drop_column('messages', 'model')
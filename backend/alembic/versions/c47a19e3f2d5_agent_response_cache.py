@@ -0,0 +1,28 @@
+"""agent response cache flags
+
+Revision ID: c47a19e3f2d5
+Revises: 8b1e5d0c6a92
+Create Date: 2026-10-18 10:48:19.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a19e3f2d5'
+down_revision: Union[str, None] = '8b1e5d0c6a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('agents', sa.Column('response_cache_enabled', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.add_column('agents', sa.Column('response_cache_semantic', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('agents', 'response_cache_semantic')
+    op.drop_column('agents', 'response_cache_enabled')
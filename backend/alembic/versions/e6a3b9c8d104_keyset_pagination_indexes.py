@@ -0,0 +1,42 @@
+"""keyset pagination indexes
+
+Revision ID: e6a3b9c8d104
+Revises: 5d2e8f1a0b37
+Create Date: 2026-10-18 12:05:37.948215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a3b9c8d104'
+down_revision: Union[str, None] = '5d2e8f1a0b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # composite (parent, created_at, id) indexes serve both the parent lookups
+    # and (created_at, id) keyset pages, so the single-column ones are dropped
+    op.create_index('ix_projects_user_id_created_at', 'projects', ['user_id', 'created_at', 'id'], unique=False)
+    op.drop_index(op.f('ix_projects_user_id'), table_name='projects')
+    op.create_index('ix_agents_project_id_created_at', 'agents', ['project_id', 'created_at', 'id'], unique=False)
+    op.drop_index(op.f('ix_agents_project_id'), table_name='agents')
+    op.create_index('ix_prompts_agent_id_created_at', 'prompts', ['agent_id', 'created_at', 'id'], unique=False)
+    op.drop_index(op.f('ix_prompts_agent_id'), table_name='prompts')
+    op.create_index('ix_conversations_agent_id_user_id_created_at', 'conversations', ['agent_id', 'user_id', 'created_at', 'id'], unique=False)
+    op.drop_index(op.f('ix_conversations_agent_id'), table_name='conversations')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_conversations_agent_id'), 'conversations', ['agent_id'], unique=False)
+    op.drop_index('ix_conversations_agent_id_user_id_created_at', table_name='conversations')
+    op.create_index(op.f('ix_prompts_agent_id'), 'prompts', ['agent_id'], unique=False)
+    op.drop_index('ix_prompts_agent_id_created_at', table_name='prompts')
+    op.create_index(op.f('ix_agents_project_id'), 'agents', ['project_id'], unique=False)
+    op.drop_index('ix_agents_project_id_created_at', table_name='agents')
+    op.create_index(op.f('ix_projects_user_id'), 'projects', ['user_id'], unique=False)
+    op.drop_index('ix_projects_user_id_created_at', table_name='projects')
@@ -0,0 +1,42 @@
+"""cold conversation archives
+
+Revision ID: f3b6d2a8c915
+Revises: d5c8a1f7b420
+Create Date: 2026-10-18 17:08:32.517340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b6d2a8c915'
+down_revision: Union[str, None] = 'd5c8a1f7b420'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('conversations', sa.Column('rehydrated_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_table('conversation_archives',
+    sa.Column('conversation_id', sa.String(), nullable=False),
+    sa.Column('codec', sa.String(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('raw_bytes', sa.Integer(), nullable=False),
+    sa.Column('first_message_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ),
+    sa.PrimaryKeyConstraint('conversation_id')
+    )
+
+
+def downgrade() -> None:
+    # archived messages would be lost: rehydrate before downgrading
+    op.drop_table('conversation_archives')
+    op.drop_column('conversations', 'rehydrated_at')
+    op.drop_column('conversations', 'archived_at')
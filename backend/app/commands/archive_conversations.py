@@ -0,0 +1,56 @@
+"""
+Compresses inactive conversations out of the messages table.
+
+    python -m app.commands.archive_conversations [--inactive-days 60] [--limit 10000] [--dry-run]
+
+Each conversation with no message in the last `inactive-days` is moved into
+one zlib-compressed conversation_archives row, in its own transaction. The
+chat endpoint and the message history endpoint restore it when the
+conversation is opened again. Safe to run from cron and to run several
+copies at once on Postgres (rows are claimed with SKIP LOCKED).
+"""
+import argparse
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.archive import archive_conversation, default_cutoff, inactive_conversations
+
+
+def archive(inactive_days: int, limit: int | None = None, dry_run: bool = False) -> tuple[int, int]:
+    cutoff = default_cutoff(inactive_days)
+    conversations = messages = 0
+    after = None
+    with SessionLocal() as db:
+        while limit is None or conversations < limit:
+            page = inactive_conversations(db, cutoff, settings.ARCHIVE_BATCH_SIZE, after)
+            db.rollback()
+            if not page:
+                break
+            after = tuple(page[-1])
+            for _, conversation_id in page:
+                if limit is not None and conversations >= limit:
+                    break
+                archived = 0 if dry_run else archive_conversation(db, conversation_id, cutoff)
+                # None: claimed by another archiver or active again
+                if archived is not None:
+                    conversations += 1
+                    messages += archived
+    return conversations, messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive inactive conversations")
+    parser.add_argument("--inactive-days", type=int, default=settings.ARCHIVE_INACTIVE_DAYS)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many conversations")
+    parser.add_argument("--dry-run", action="store_true", help="count candidates without archiving")
+    args = parser.parse_args()
+
+    conversations, messages = archive(args.inactive_days, args.limit, args.dry_run)
+    if args.dry_run:
+        print(f"{conversations} conversations idle for {args.inactive_days}+ days")
+    else:
+        print(f"archived {messages} messages from {conversations} conversations")
+
+
+if __name__ == "__main__":
+    main()
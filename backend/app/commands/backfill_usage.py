@@ -0,0 +1,114 @@
+"""
+Rebuilds the hourly usage rollups from the messages table.
+
+    python -m app.commands.backfill_usage --since 2026-01-01 [--until 2026-02-01] [--estimate-missing]
+
+Rollup rows in [since, until) are re-aggregated and overwritten in one
+transaction, so the command is safe to re-run. Only (hour, user, project,
+agent, model) rows that still have source messages are touched: a purged
+agent's messages are gone but its rollups are kept as the billing record,
+and a rebuild must not erase them. `until` defaults to the start
+of the current hour to stay clear of rows live traffic is still updating.
+--estimate-missing counts a token estimate for assistant messages recorded
+before usage was captured. Messages of archived conversations are read from
+their archive rows.
+"""
+import argparse
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.agent import Agent
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.archive import archived_messages
+from app.services.context import estimate_tokens
+from app.services.usage import Rollup, hour_bucket, upsert_statement
+
+BATCH = 1000
+
+
+def _parse(value: str) -> datetime:
+    ts = datetime.fromisoformat(value)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def backfill(since: datetime, until: datetime, estimate_missing: bool = False) -> int:
+    since, until = hour_bucket(since), hour_bucket(until)
+    q = (
+        select(
+            Message.created_at,
+            Message.content,
+            Message.model,
+            Message.prompt_tokens,
+            Message.completion_tokens,
+            Message.cached_tokens,
+            Message.latency_ms,
+            Conversation.user_id,
+            Conversation.agent_id,
+            Agent.project_id,
+            Agent.model_name,
+        )
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .join(Agent, Agent.id == Conversation.agent_id)
+        .where(Message.role == "assistant", Message.created_at >= since, Message.created_at < until)
+        .execution_options(yield_per=BATCH)
+    )
+
+    rollup = Rollup()
+    counted = 0
+
+    def add(m, user_id, project_id, agent_id, model_name):
+        completion = m["completion_tokens"]
+        if completion is None and estimate_missing:
+            completion = estimate_tokens(m["content"])
+        rollup.add(
+            m["created_at"], user_id, project_id, agent_id, m["model"] or model_name,
+            requests=1,
+            prompt_tokens=m["prompt_tokens"],
+            completion_tokens=completion,
+            cached_tokens=m["cached_tokens"],
+            latency_ms=m["latency_ms"],
+        )
+
+    with SessionLocal() as db:
+        for r in db.execute(q):
+            add(r._mapping, r.user_id, r.project_id, r.agent_id, r.model_name)
+            counted += 1
+
+        owners: dict[str, tuple] = {}
+        for conversation_id, m in archived_messages(db, since, until):
+            if m["role"] != "assistant":
+                continue
+            if conversation_id not in owners:
+                owners[conversation_id] = db.execute(
+                    select(Conversation.user_id, Agent.project_id, Conversation.agent_id, Agent.model_name)
+                    .join(Agent, Agent.id == Conversation.agent_id)
+                    .where(Conversation.id == conversation_id)
+                ).one()
+            add(m, *owners[conversation_id])
+            counted += 1
+
+        rows = rollup.values()
+        stmt = upsert_statement(db.get_bind().dialect.name, replace=True)
+        for i in range(0, len(rows), BATCH):
+            db.execute(stmt, rows[i:i + BATCH])
+        db.commit()
+    return counted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild hourly usage rollups from messages")
+    parser.add_argument("--since", required=True, type=_parse, help="ISO date/time (UTC if no offset)")
+    parser.add_argument("--until", type=_parse, default=None, help="defaults to the start of the current hour")
+    parser.add_argument("--estimate-missing", action="store_true", help="estimate tokens for messages without usage")
+    args = parser.parse_args()
+
+    until = args.until or datetime.now(timezone.utc)
+    counted = backfill(args.since, until, args.estimate_missing)
+    print(f"rolled up {counted} assistant messages between {hour_bucket(args.since)} and {hour_bucket(until)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,14 +9,136 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+
     JWT_SECRET: str | None = None
     JWT_ALGORITHM: str | None = "HS256"
 
+    # password hashing (dedicated process pool)
+    BCRYPT_ROUNDS: int = 12
+    HASH_WORKERS: int = 2
+    HASH_QUEUE_MAX: int = 64
+
+    # verified token -> user snapshot cache
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+
     # =====================
     # OpenAI
     # =====================
     OPENAI_API_KEY: str | None = None
     OPENAI_MODEL: str | None = "gpt-4o-mini"
+    # point at a proxy or the benchmark mock server (backend/bench/mock_llm.py)
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+
+    # =====================
+    # LLM routing
+    # =====================
+    # extra upstreams speaking the Responses API, as JSON, e.g.
+    # {"azure": {"base_url": "https://example.openai.azure.com/openai/v1", "api_key": "...", "models": ["gpt-4o-mini"]}}
+    # agents select one by name; "models" lists what it takes over on failover
+    LLM_PROVIDERS: dict[str, dict] = {}
+    # the local echo provider ("mock"), for tests and demos only
+    LLM_MOCK_PROVIDER_ENABLED: bool = False
+    # hedging: fire a second request once the first is slower than its p95 TTFT
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_DELAY_MS: float = 200.0
+    LLM_HEDGE_DEFAULT_DELAY_MS: float = 2000.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    # failover on 5xx/429/transport errors before the first delta
+    LLM_FAILOVER_ATTEMPTS: int = 3
+    LLM_PROVIDER_COOLDOWN_SECONDS: float = 30.0
+    # cap on a (jittered) wait before retrying the same upstream after a 429/5xx
+    LLM_RETRY_MAX_WAIT_SECONDS: float = 10.0
+
+    # admission control per "provider:model"; overrides as JSON, e.g. {"openai:gpt-4o": 8}
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_CONCURRENCY_LIMITS: dict[str, int] = {}
+    # token budget per minute (0 = unlimited), counted from the prompt estimate
+    # plus LLM_OUTPUT_TOKENS_ESTIMATE
+    LLM_TOKENS_PER_MINUTE: int = 0
+    LLM_TPM_LIMITS: dict[str, int] = {}
+    LLM_OUTPUT_TOKENS_ESTIMATE: int = 512
+    # bounded wait queue, served round-robin across users; beyond it requests get a fast 503
+    LLM_QUEUE_MAX: int = 256
+    LLM_QUEUE_MAX_PER_USER: int = 4
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    # identical in-flight chat requests share one upstream stream
+    LLM_COALESCE_ENABLED: bool = True
+
+    # =====================
+    # Upstream HTTP pool
+    # =====================
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP2_ENABLED: bool = True
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_STREAM_READ_TIMEOUT_SECONDS: float | None = None
+    FILES_TIMEOUT_SECONDS: float = 120.0
+
+    # =====================
+    # Chat context
+    # =====================
+    # history token budget; per-model overrides as JSON, e.g. {"gpt-4o": 32000}
+    CONTEXT_TOKEN_BUDGET: int = 8000
+    CONTEXT_TOKEN_BUDGETS: dict[str, int] = {}
+
+    # rolling conversation summaries: once more than SUMMARY_TRIGGER_MESSAGES
+    # unsummarized messages exist, all but the last SUMMARY_KEEP_RECENT are folded
+    SUMMARY_ENABLED: bool = True
+    SUMMARY_TRIGGER_MESSAGES: int = 40
+    SUMMARY_KEEP_RECENT: int = 20
+    SUMMARY_BATCH_MAX: int = 200
+    SUMMARY_MODEL: str = "gpt-4o-mini"
+    SUMMARY_PROVIDER: str = "openai"
+
+    # opt-in (per agent) cache of full answers
+    RESPONSE_CACHE_SIZE: int = 10000
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+
+    # file uploads
+    UPLOAD_MAX_FILE_BYTES: int = 50 * 1024 * 1024
+    UPLOAD_MAX_USER_INFLIGHT_BYTES: int = 200 * 1024 * 1024
+    # content-addressed local copies of uploaded files
+    FILE_STORE_DIR: str = "data/files"
+
+    # retrieval over agent files
+    RETRIEVAL_DIR: str = "data/indexes"
+    RETRIEVAL_EMBEDDER: str = "hashing"  # hashing | openai
+    RETRIEVAL_OPENAI_MODEL: str = "text-embedding-3-small"
+    RETRIEVAL_EMBED_DIM: int = 256
+    RETRIEVAL_CHUNK_CHARS: int = 1200
+    RETRIEVAL_CHUNK_OVERLAP: int = 200
+    RETRIEVAL_TOP_K: int = 4
+    RETRIEVAL_MMAP: bool = False
+    RETRIEVAL_CACHED_INDEXES: int = 32
+
+    # chat turn persistence; write-behind batches turns in a background task
+    PERSIST_WRITE_BEHIND: bool = False
+    PERSIST_BATCH_SIZE: int = 200
+    PERSIST_FLUSH_INTERVAL_MS: int = 50
+
+    # conversations idle this long are compressed out of the messages table
+    # by `python -m app.commands.archive_conversations`
+    ARCHIVE_INACTIVE_DAYS: int = 60
+    ARCHIVE_BATCH_SIZE: int = 100
+
+    # background purge of deleted agents/projects: short batched deletes
+    DELETION_BATCH_SIZE: int = 1000
+    DELETION_BATCH_PAUSE_MS: int = 20
+    DELETION_POLL_SECONDS: float = 10.0
+    DELETION_LEASE_SECONDS: float = 120.0
+    DELETION_MAX_ATTEMPTS: int = 8
+
+    # compiled agent (config + system prompt) cache
+    AGENT_CACHE_SIZE: int = 1024
+    AGENT_CACHE_TTL_SECONDS: float = 300.0
+
+    # bearer token the Prometheus scraper sends to /metrics; unset hides it
+    METRICS_TOKEN: str | None = None
 
     # =====================
     # SMTP / Email
@@ -26,6 +148,18 @@ class Settings(BaseSettings):
     SMTP_FROM: str | None = None
     SMTP_SERVER: str | None = None
     SMTP_PORT: int | None = None
+    SMTP_STARTTLS: bool = True
+    SMTP_SSL_TLS: bool = False
+
+    # outbound mail queue
+    MAIL_QUEUE_BATCH_SIZE: int = 50
+    MAIL_QUEUE_POLL_SECONDS: float = 5.0
+    MAIL_QUEUE_LEASE_SECONDS: float = 120.0
+    MAIL_MAX_ATTEMPTS: int = 8
+    MAIL_SMTP_IDLE_SECONDS: float = 30.0
+    # upper bound on one send (connect, login and delivery); the worker
+    # renews a batch's lease whenever less than this much of it is left
+    MAIL_SMTP_TIMEOUT_SECONDS: float = 30.0
 
     class Config:
         env_file = ".env"
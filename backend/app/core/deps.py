@@ -2,8 +2,10 @@ from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.principal_cache import CurrentUser, principal_cache
+from app.db.session import SessionLocal, AsyncSessionLocal
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -15,16 +17,36 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _decode(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
+        if not payload.get("sub"):
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
 
-    user = db.get(User, user_id)
+def _remember(token: str, payload: dict, user: User | None) -> CurrentUser:
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    current = CurrentUser(id=user.id, email=user.email, name=user.name)
+    principal_cache.put(token, current, payload.get("exp"))
+    return current
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
+    cached = principal_cache.get(token)
+    if cached:
+        return cached
+    payload = _decode(token)
+    return _remember(token, payload, db.get(User, payload["sub"]))
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> CurrentUser:
+    cached = principal_cache.get(token)
+    if cached:
+        return cached
+    payload = _decode(token)
+    return _remember(token, payload, await db.get(User, payload["sub"]))
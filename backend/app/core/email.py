@@ -1,35 +1,57 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+import time
+from email.message import EmailMessage
+
+import aiosmtplib
 from app.core.config import settings
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.SMTP_USERNAME,
-    MAIL_PASSWORD=settings.SMTP_PASSWORD,
-    MAIL_FROM=settings.SMTP_FROM,
-    MAIL_SERVER=settings.SMTP_SERVER,
-    MAIL_PORT=settings.SMTP_PORT,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-)
-
-fm = FastMail(conf)
-
-
-async def send_email(
-    *,
-    subject: str,
-    recipients: list[str],
-    body: str,
-    subtype: str = "plain",
-):
+
+class SMTPSender:
     """
-    Generic email sender
+    Keeps one SMTP connection open across sends (reconnecting after
+    MAIL_SMTP_IDLE_SECONDS or a dropped connection). Used by the mail
+    queue worker; not safe for concurrent use.
     """
-    message = MessageSchema(
-        subject=subject,
-        recipients=recipients,
-        body=body,
-        subtype=subtype,
-    )
-
-    await fm.send_message(message)
+
+    def __init__(self):
+        self._client: aiosmtplib.SMTP | None = None
+        self._last_used = 0.0
+
+    async def _connect(self):
+        await self.close()
+        client = aiosmtplib.SMTP(
+            hostname=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            use_tls=settings.SMTP_SSL_TLS,
+            start_tls=settings.SMTP_STARTTLS,
+            timeout=settings.MAIL_SMTP_TIMEOUT_SECONDS,
+        )
+        await client.connect()
+        if settings.SMTP_USERNAME:
+            await client.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD or "")
+        self._client = client
+
+    async def send(self, *, subject: str, recipients: list[str], body: str, subtype: str = "plain"):
+        message = EmailMessage()
+        message["From"] = settings.SMTP_FROM
+        message["To"] = ", ".join(recipients)
+        message["Subject"] = subject
+        message.set_content(body, subtype=subtype)
+
+        idle = time.monotonic() - self._last_used
+        if self._client is None or not self._client.is_connected or idle > settings.MAIL_SMTP_IDLE_SECONDS:
+            await self._connect()
+        try:
+            await self._client.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            await self._connect()
+            await self._client.send_message(message)
+        self._last_used = time.monotonic()
+
+    async def close(self):
+        if self._client is not None:
+            try:
+                if self._client.is_connected:
+                    await self._client.quit()
+            except aiosmtplib.SMTPException:
+                self._client.close()
+            self._client = None
@@ -0,0 +1,21 @@
+from functools import lru_cache
+from passlib.context import CryptContext
+
+# Runs inside the hashing process pool; keep imports light.
+
+
+@lru_cache(maxsize=4)
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def hash_in_worker(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def verify_in_worker(password: str, hashed: str, rounds: int) -> tuple[bool, str | None]:
+    """
+    Returns (ok, new_hash); new_hash is set when the stored hash uses a
+    different cost than configured and should be replaced.
+    """
+    return _context(rounds).verify_and_update(password, hashed)
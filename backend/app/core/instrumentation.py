@@ -0,0 +1,70 @@
+import logging
+import time
+from app.core import metrics
+
+log = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (streams pass through untouched): request latency
+    by route template and status, in-flight requests, and the SQL statement
+    count/time each request caused.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.HTTP_IN_FLIGHT.dec()
+            metrics.current_request.reset(token)
+            # the template, not the raw path, keeps label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, method=scope["method"], route=path, status=status
+            )
+            metrics.DB_QUERIES_PER_REQUEST.observe(stats.queries, route=path)
+            metrics.DB_SECONDS_PER_REQUEST.observe(stats.db_seconds, route=path)
+
+
+async def track_stream(body, source: str):
+    """
+    Wraps an SSE body: open-stream gauge and lifetime by outcome
+    (completed, error, or disconnected when the client went away). A body
+    that fails is expected to have sent its own error frame; the error is
+    logged here and the response ends cleanly instead of being cut off.
+    """
+    opened = time.perf_counter()
+    outcome = "disconnected"
+    metrics.SSE_ACTIVE.inc()
+    try:
+        async for chunk in body:
+            yield chunk
+        outcome = "completed"
+    except Exception:
+        outcome = "error"
+        log.exception("%s stream failed", source)
+    finally:
+        metrics.SSE_ACTIVE.dec()
+        metrics.SSE_STREAM_SECONDS.observe(time.perf_counter() - opened, source=source, outcome=outcome)
+        await body.aclose()
@@ -0,0 +1,190 @@
+import bisect
+import contextvars
+import threading
+from typing import Callable
+
+# =========================
+# Minimal in-process Prometheus registry (text exposition format 0.0.4).
+# Each worker process exposes its own series; scrape every worker, or sum
+# at query time. Values are guarded by one lock since sync endpoints run
+# in the threadpool.
+
+_lock = threading.Lock()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STREAM_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+def _fmt_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, object] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labels)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with _lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """
+    Set directly, or computed at scrape time by `collect` (a callable
+    returning {label tuple: value}).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), collect: Callable[[], dict] | None = None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> list[str]:
+        if self.collect is not None:
+            items = list(self.collect().items())
+        else:
+            with _lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list[str]:
+        with _lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._values.items()]
+        lines = []
+        for key, (counts, total, n) in items:
+            running = 0
+            for bound, count in zip(self.buckets, counts):
+                running += count
+                le = 'le="%s"' % _num(bound)
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {running}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {n}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {n}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render_latest() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.header()
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# =========================
+# Per-request DB accounting: the middleware opens a RequestStats in a
+# context variable; SQLAlchemy cursor events add to whichever is current.
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+current_request: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("current_request", default=None)
+
+
+# =========================
+# Series
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to complete a request, by route template",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served")
+
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Time per SQL statement", ("engine",))
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements issued per request", ("route",), buckets=COUNT_BUCKETS
+)
+DB_SECONDS_PER_REQUEST = Histogram("db_time_per_request_seconds", "Time spent in SQL per request", ("route",))
+# filled in by app.db.session, which owns the engines
+DB_POOL_CONNECTIONS = Gauge("db_pool_connections", "Connection pool usage", ("engine", "state"))
+
+LLM_TTFT_SECONDS = Histogram("llm_time_to_first_token_seconds", "Upstream time to first delta", ("provider", "model"))
+LLM_TOTAL_SECONDS = Histogram(
+    "llm_stream_duration_seconds", "Upstream call from request to last delta", ("provider", "model"),
+    buckets=STREAM_BUCKETS,
+)
+LLM_ERRORS = Counter("llm_errors_total", "Failed upstream attempts by error class", ("provider", "model", "error"))
+
+SSE_ACTIVE = Gauge("sse_streams_active", "Chat streams currently open")
+SSE_STREAM_SECONDS = Histogram(
+    "sse_stream_duration_seconds", "Chat stream lifetime, by answer source and outcome", ("source", "outcome"),
+    buckets=STREAM_BUCKETS,
+)
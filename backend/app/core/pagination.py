@@ -0,0 +1,60 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_token(values: list) -> str:
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_token(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    return encode_token([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, row_id = decode_token(cursor)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, model, response: Response, cursor: str | None, limit: int, descending: bool = False) -> list:
+    """
+    Keyset pagination on (created_at, id). Returns one page of rows and sets
+    the X-Next-Cursor header when more rows follow, so list endpoints keep
+    returning a plain JSON array.
+    """
+    key = tuple_(model.created_at, model.id)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor))
+        query = query.filter(key < after if descending else key > after)
+
+    if descending:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
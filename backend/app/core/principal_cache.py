@@ -0,0 +1,77 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    Immutable snapshot of the authenticated user. Routes that need to
+    modify the user must load the ORM row themselves.
+    """
+    id: str
+    email: str
+    name: str
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of verified tokens -> CurrentUser. Entries expire at the
+    token's `exp` or after PRINCIPAL_CACHE_TTL_SECONDS, whichever is first;
+    the TTL also bounds staleness on workers that missed an invalidation.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[float, CurrentUser]] = OrderedDict()
+        self._by_user: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> CurrentUser | None:
+        key = token_digest(token)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, user = item
+            if time.time() >= expires_at:
+                self._drop(key)
+                return None
+            self._items.move_to_end(key)
+            return user
+
+    def put(self, token: str, user: CurrentUser, token_exp: float | None):
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        key = token_digest(token)
+        with self._lock:
+            self._items[key] = (expires_at, user)
+            self._items.move_to_end(key)
+            self._by_user.setdefault(user.id, set()).add(key)
+            while len(self._items) > self.maxsize:
+                self._drop(next(iter(self._items)))
+
+    def invalidate_user(self, user_id: str):
+        with self._lock:
+            for key in self._by_user.pop(user_id, set()):
+                self._items.pop(key, None)
+
+    def _drop(self, key: str):
+        _, user = self._items.pop(key)
+        keys = self._by_user.get(user.id)
+        if keys:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user.id]
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
@@ -1,9 +1,14 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.hashing import hash_in_worker, verify_in_worker
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -15,3 +20,59 @@ def create_access_token(subject: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     payload = {"sub": subject, "exp": expire}
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+
+# =========================
+# OFFLOADED HASHING
+# =========================
+# bcrypt runs in a dedicated process pool so login bursts neither block the
+# event loop nor starve the threadpool used by sync endpoints. Work beyond
+# HASH_WORKERS + HASH_QUEUE_MAX in flight is rejected with a 503.
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_in_flight = 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.HASH_WORKERS)
+        return _executor
+
+
+def shutdown_hashing():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def _submit(fn, *args):
+    global _in_flight
+    if _in_flight >= settings.HASH_WORKERS + settings.HASH_QUEUE_MAX:
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _in_flight -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _submit(hash_in_worker, password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_password_async(password: str, hashed: str) -> tuple[bool, str | None]:
+    """
+    Returns (ok, new_hash). new_hash is set when the stored hash was made
+    with a different bcrypt cost; callers should persist it.
+    """
+    return await _submit(verify_in_worker, password, hashed, settings.BCRYPT_ROUNDS)
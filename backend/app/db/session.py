@@ -1,6 +1,73 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from app.core import metrics
 from app.core.config import settings
 
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _async_url(url: str):
+    # psycopg 3 serves both sync and async; sqlite needs aiosqlite (dev/bench only)
+    u = make_url(url)
+    if u.get_backend_name() == "postgresql":
+        return u.set(drivername="postgresql+psycopg")
+    if u.get_backend_name() == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite")
+    return u
+
+
+_async_pool = {}
+if not settings.DATABASE_URL.startswith("sqlite"):
+    _async_pool = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+
+async_engine = create_async_engine(_async_url(settings.DATABASE_URL), pool_pre_ping=True, **_async_pool)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+# =========================
+# Instrumentation: statement timings (and per-request totals via the
+# metrics middleware) plus pool usage read at scrape time.
+
+def _instrument(sync_engine, name: str):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        metrics.DB_QUERY_SECONDS.observe(elapsed, engine=name)
+        stats = metrics.current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+_instrument(engine, "sync")
+_instrument(async_engine.sync_engine, "async")
+
+
+def _pool_stats() -> dict:
+    out = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        # QueuePool only; sqlite pools don't report these
+        if not hasattr(pool, "checkedout"):
+            continue
+        out[(name, "checked_out")] = pool.checkedout()
+        out[(name, "size")] = pool.size()
+        out[(name, "overflow")] = max(0, pool.overflow())
+        out[(name, "max")] = pool.size() + getattr(pool, "_max_overflow", 0)
+    return out
+
+
+metrics.DB_POOL_CONNECTIONS.collect = _pool_stats
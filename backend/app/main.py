@@ -1,9 +1,54 @@
-from fastapi import FastAPI
+import asyncio
+import hmac
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import auth, projects, agents, prompts, chat, files
+from app.routers import auth, projects, agents, prompts, chat, files, conversations, usage, search, deletions
+from app.core import metrics
+from app.core.config import settings
+from app.core.instrumentation import MetricsMiddleware
+from app.core.security import shutdown_hashing
+from app.db.session import async_engine
+from app.services.agent_cache import listen_for_invalidations
+from app.services.http_clients import open_clients, close_clients
+from app.services.deletion import deletion_worker
+from app.services.mail_queue import mail_worker
+from app.services.persistence import message_writer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # pooled upstream clients live for the whole process
+    await open_clients()
+    if settings.PERSIST_WRITE_BEHIND:
+        message_writer.start()
+    mail_worker.start()
+    deletion_worker.start()
+
+    # cross-worker agent cache invalidation rides on Postgres LISTEN/NOTIFY
+    listener = None
+    if async_engine.dialect.name == "postgresql":
+        listener = asyncio.create_task(listen_for_invalidations())
+
+    yield
+
+    if listener:
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
 
-app = FastAPI(title="Chatbot Platform API")
+    # flush queued chat turns before the pools go away
+    await message_writer.stop()
+    await mail_worker.stop()
+    await deletion_worker.stop()
+    await close_clients()
+    shutdown_hashing()
+    await async_engine.dispose()
+
+
+app = FastAPI(title="Chatbot Platform API", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -23,8 +68,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # keyset pagination cursor for list endpoints
+    expose_headers=["X-Next-Cursor"],
 )
 
+# added last so it wraps everything, CORS preflights included
+app.add_middleware(MetricsMiddleware)
+
 # =========================
 # API ROUTERS (WITH PREFIX)
 # =========================
@@ -36,9 +86,25 @@ app.include_router(agents.router, prefix="/api")
 app.include_router(prompts.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
 app.include_router(files.router, prefix="/api")
-
+app.include_router(conversations.router, prefix="/api")
+app.include_router(usage.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(deletions.router, prefix="/api")
 
 
 @app.get("/health")
 def health():
     return {"ok": True}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(authorization: str | None = Header(default=None)):
+    # per-route/provider/model traffic is not for the public: without
+    # METRICS_TOKEN the endpoint does not exist, with it the scraper must
+    # send it as a bearer token
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not hmac.compare_digest((authorization or "").encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    return Response(metrics.render_latest(), media_type="text/plain; version=0.0.4; charset=utf-8")
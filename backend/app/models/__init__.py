@@ -4,3 +4,8 @@ from app.models.agent import Agent
 from app.models.prompt import Prompt
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.models.outbound_email import OutboundEmail
+from app.models.file import File
+from app.models.usage import UsageHourly
+from app.models.archive import ConversationArchive
+from app.models.deletion_job import DeletionJob
@@ -1,17 +1,24 @@
 import uuid
-from sqlalchemy import String, ForeignKey, DateTime, func
+from sqlalchemy import String, Index, Boolean, ForeignKey, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 class Agent(Base):
     __tablename__ = "agents"
+    __table_args__ = (
+        Index("ix_agents_project_id_created_at", "project_id", "created_at", "id"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id"), index=True)
+    project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id"))
     name: Mapped[str] = mapped_column(String)
     system_prompt: Mapped[str] = mapped_column(String, default="You are a helpful assistant.")
     model_provider: Mapped[str] = mapped_column(String, default="openai")
     model_name: Mapped[str] = mapped_column(String, default="gpt-4o-mini")
+    response_cache_enabled: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    response_cache_semantic: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # hidden from the API once set; rows and children are purged by a deletion job
+    deleted_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     project = relationship("Project", back_populates="agents")
     prompts = relationship("Prompt", back_populates="agent")
@@ -0,0 +1,18 @@
+from sqlalchemy import String, Integer, LargeBinary, ForeignKey, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class ConversationArchive(Base):
+    """
+    All messages of an inactive conversation, compressed into one row and
+    removed from `messages`; restored when the conversation is reopened.
+    """
+    __tablename__ = "conversation_archives"
+    conversation_id: Mapped[str] = mapped_column(String, ForeignKey("conversations.id"), primary_key=True)
+    codec: Mapped[str] = mapped_column(String)  # e.g. zlib+json
+    payload: Mapped[bytes] = mapped_column(LargeBinary)
+    message_count: Mapped[int] = mapped_column(Integer)
+    raw_bytes: Mapped[int] = mapped_column(Integer)
+    first_message_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_message_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    archived_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,14 +1,28 @@
 import uuid
-from sqlalchemy import String, ForeignKey, DateTime, func
+from sqlalchemy import String, Text, Index, ForeignKey, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_agent_id_user_id_created_at", "agent_id", "user_id", "created_at", "id"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    agent_id: Mapped[str] = mapped_column(String, ForeignKey("agents.id"), index=True)
+    agent_id: Mapped[str] = mapped_column(String, ForeignKey("agents.id"))
     user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), index=True)
     title: Mapped[str] = mapped_column(String, default="New Chat")
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+    # rolling summary of messages up to and including summary_message_id
+    summary: Mapped[str] = mapped_column(Text, default="", server_default="")
+    summary_message_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    summary_message_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # set while the messages live compressed in conversation_archives
+    archived_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # last restore from the archive; counts as activity, so reading an old
+    # conversation does not make it eligible for archiving again
+    rehydrated_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
     messages = relationship("Message", back_populates="conversation")
@@ -0,0 +1,29 @@
+import uuid
+from sqlalchemy import String, Integer, DateTime, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class DeletionJob(Base):
+    """
+    Background purge of a soft-deleted agent or project and everything
+    under it, with running counts for the status endpoint.
+    """
+    __tablename__ = "deletion_jobs"
+    __table_args__ = (
+        Index("ix_deletion_jobs_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id: Mapped[str] = mapped_column(String, index=True)
+    kind: Mapped[str] = mapped_column(String)  # agent/project
+    target_id: Mapped[str] = mapped_column(String)
+    status: Mapped[str] = mapped_column(String, default="pending")  # pending/done/failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # when pending: earliest next try; also acts as the lease while a worker purges
+    next_attempt_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    deleted_messages: Mapped[int] = mapped_column(Integer, default=0)
+    deleted_conversations: Mapped[int] = mapped_column(Integer, default=0)
+    deleted_prompts: Mapped[int] = mapped_column(Integer, default=0)
+    deleted_agents: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    finished_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,19 @@
+import uuid
+from sqlalchemy import String, BigInteger, ForeignKey, DateTime, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class File(Base):
+    __tablename__ = "files"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "sha256", name="uq_files_owner_id_sha256"),
+    )
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    sha256: Mapped[str] = mapped_column(String, index=True)
+    owner_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"))
+    filename: Mapped[str] = mapped_column(String)
+    size: Mapped[int] = mapped_column(BigInteger)
+    mime_type: Mapped[str] = mapped_column(String)
+    provider_file_id: Mapped[str | None] = mapped_column(String, nullable=True, index=True)
+    blob_path: Mapped[str] = mapped_column(String)
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
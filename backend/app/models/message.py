@@ -1,14 +1,64 @@
 import uuid
-from sqlalchemy import String, ForeignKey, DateTime, func
+from sqlalchemy import DDL, String, Integer, Text, ForeignKey, DateTime, Index, event, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
+# Postgres keeps search_vector (and a missing user_id) filled by trigger;
+# same SQL as migration d5c8a1f7b420, whose text search config must match
+# TS_CONFIG in app/services/search.py. Applied here for create_all only.
+SEARCH_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION messages_search_fill() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('english'::regconfig, coalesce(NEW.content, ''));
+    IF NEW.user_id IS NULL THEN
+        SELECT user_id INTO NEW.user_id FROM conversations WHERE id = NEW.conversation_id;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER messages_search_fill BEFORE INSERT OR UPDATE OF content, user_id ON messages
+    FOR EACH ROW EXECUTE FUNCTION messages_search_fill();
+"""
+
+
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at"),
+        # btree_gin: one index probe answers "this user's messages matching
+        # the query" instead of matching every user's rows first
+        Index(
+            "ix_messages_user_id_search_vector", "user_id", "search_vector", postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    conversation_id: Mapped[str] = mapped_column(String, ForeignKey("conversations.id"), index=True)
+    conversation_id: Mapped[str] = mapped_column(String, ForeignKey("conversations.id"))
     role: Mapped[str] = mapped_column(String)  # user/assistant/system
     content: Mapped[str] = mapped_column(String)
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+    # assistant messages: what the upstream call cost
+    model: Mapped[str | None] = mapped_column(String, nullable=True)
+    prompt_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    completion_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cached_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    ttft_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # copy of the conversation's owner, so search can be scoped by index
+    user_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    # filled by trigger on Postgres, never written by the app; plain text and
+    # unused on SQLite
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR().with_variant(Text(), "sqlite"), nullable=True, deferred=True
+    )
+
     conversation = relationship("Conversation", back_populates="messages")
+
+
+event.listen(
+    Message.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gin").execute_if(dialect="postgresql"),
+)
+event.listen(Message.__table__, "after_create", DDL(SEARCH_TRIGGER_SQL).execute_if(dialect="postgresql"))
@@ -0,0 +1,22 @@
+import uuid
+from sqlalchemy import String, Text, Integer, DateTime, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class OutboundEmail(Base):
+    __tablename__ = "outbound_emails"
+    __table_args__ = (
+        Index("ix_outbound_emails_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    recipients: Mapped[str] = mapped_column(String)  # comma separated
+    subject: Mapped[str] = mapped_column(String)
+    body: Mapped[str] = mapped_column(Text)
+    subtype: Mapped[str] = mapped_column(String, default="plain")
+    status: Mapped[str] = mapped_column(String, default="pending")  # pending/sent/failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # when pending: earliest next try; also acts as the lease while a worker sends it
+    next_attempt_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    sent_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,15 +1,20 @@
 import uuid
-from sqlalchemy import String, ForeignKey, DateTime, func
+from sqlalchemy import String, Index, ForeignKey, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_user_id_created_at", "user_id", "created_at", "id"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), index=True)
+    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"))
     name: Mapped[str] = mapped_column(String)
     description: Mapped[str] = mapped_column(String, default="")
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # hidden from the API once set; rows and children are purged by a deletion job
+    deleted_at: Mapped[str | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     user = relationship("User", back_populates="projects")
     agents = relationship("Agent", back_populates="project")
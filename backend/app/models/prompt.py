@@ -1,12 +1,15 @@
 import uuid
-from sqlalchemy import String, ForeignKey, DateTime, func
+from sqlalchemy import String, Index, ForeignKey, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 class Prompt(Base):
     __tablename__ = "prompts"
+    __table_args__ = (
+        Index("ix_prompts_agent_id_created_at", "agent_id", "created_at", "id"),
+    )
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    agent_id: Mapped[str] = mapped_column(String, ForeignKey("agents.id"), index=True)
+    agent_id: Mapped[str] = mapped_column(String, ForeignKey("agents.id"))
     title: Mapped[str] = mapped_column(String)
     content: Mapped[str] = mapped_column(String)
     type: Mapped[str] = mapped_column(String, default="instruction")
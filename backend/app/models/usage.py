@@ -0,0 +1,29 @@
+import uuid
+from sqlalchemy import String, Integer, BigInteger, DateTime, Index, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class UsageHourly(Base):
+    """
+    Token usage pre-aggregated per hour and user/project/agent/model, kept
+    up to date in the same transaction as the messages it counts.
+    """
+    __tablename__ = "usage_hourly"
+    __table_args__ = (
+        UniqueConstraint("hour", "user_id", "project_id", "agent_id", "model", name="uq_usage_hourly_grain"),
+        Index("ix_usage_hourly_user_id_hour", "user_id", "hour"),
+        Index("ix_usage_hourly_project_id_hour", "project_id", "hour"),
+        Index("ix_usage_hourly_agent_id_hour", "agent_id", "hour"),
+    )
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    hour: Mapped[str] = mapped_column(DateTime(timezone=True))
+    # plain ids: usage history outlives the rows it was recorded for
+    user_id: Mapped[str] = mapped_column(String)
+    project_id: Mapped[str] = mapped_column(String)
+    agent_id: Mapped[str] = mapped_column(String)
+    model: Mapped[str] = mapped_column(String)
+    requests: Mapped[int] = mapped_column(Integer, default=0)
+    prompt_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    completion_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    cached_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    latency_ms: Mapped[int] = mapped_column(BigInteger, default=0)  # sum, divide by requests
@@ -1,13 +1,8 @@
 import uuid
+from datetime import datetime
 from sqlalchemy import String, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
-from sqlalchemy import Column, String, DateTime
-from datetime import datetime
-
-reset_token = Column(String, nullable=True)
-reset_token_expires = Column(DateTime, nullable=True)
-
 
 class User(Base):
     __tablename__ = "users"
@@ -16,5 +11,7 @@ class User(Base):
     name: Mapped[str] = mapped_column(String)
     password_hash: Mapped[str] = mapped_column(String)
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    reset_token: Mapped[str | None] = mapped_column(String, nullable=True, index=True)
+    reset_token_expires: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     projects = relationship("Project", back_populates="user")
@@ -1 +1 @@
-from app.routers import auth, projects, agents, prompts, chat
+from app.routers import auth, projects, agents, prompts, chat, files, conversations, usage, search, deletions
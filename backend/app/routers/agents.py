@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app.core.deps import get_db, get_current_user
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT, paginate
 from app.models.project import Project
 from app.models.agent import Agent
 from app.schemas.agent import AgentCreate, AgentOut
+from app.services.agent_cache import invalidate_agent
+from app.services.deletion import deletion_worker, request_deletion, utcnow
+from app.services.llm_router import llm_router
 
 router = APIRouter(tags=["agents"])
 
+
+def _check_provider(name: str):
+    # chats are only routed to the agent's own provider
+    if name not in llm_router.providers:
+        raise HTTPException(status_code=422, detail=f"Unknown model provider: {name}")
+
 @router.post("/projects/{project_id}/agents", response_model=AgentOut)
 def create_agent(project_id: str, payload: AgentCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     project = db.get(Project, project_id)
-    if not project or project.user_id != user.id:
+    if not project or project.user_id != user.id or project.deleted_at:
         raise HTTPException(status_code=404, detail="Project not found")
+    _check_provider(payload.model_provider)
 
     a = Agent(
         project_id=project_id,
@@ -19,6 +30,8 @@ def create_agent(project_id: str, payload: AgentCreate, db: Session = Depends(ge
         system_prompt=payload.system_prompt,
         model_provider=payload.model_provider,
         model_name=payload.model_name,
+        response_cache_enabled=bool(payload.response_cache_enabled),
+        response_cache_semantic=bool(payload.response_cache_semantic),
     )
     db.add(a)
     db.commit()
@@ -26,11 +39,20 @@ def create_agent(project_id: str, payload: AgentCreate, db: Session = Depends(ge
     return a
 
 @router.get("/projects/{project_id}/agents", response_model=list[AgentOut])
-def list_agents(project_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def list_agents(
+    project_id: str,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
     project = db.get(Project, project_id)
-    if not project or project.user_id != user.id:
+    if not project or project.user_id != user.id or project.deleted_at:
         raise HTTPException(status_code=404, detail="Project not found")
-    return db.query(Agent).filter(Agent.project_id == project_id).all()
+    q = db.query(Agent).filter(Agent.project_id == project_id, Agent.deleted_at.is_(None))
+    return paginate(q, Agent, response, cursor, limit)
+
 @router.put("/projects/{project_id}/agents/{agent_id}", response_model=AgentOut)
 def update_agent(
     project_id: str,
@@ -45,6 +67,7 @@ def update_agent(
         .filter(
             Agent.id == agent_id,
             Agent.project_id == project_id,
+            Agent.deleted_at.is_(None),
             Project.user_id == user.id,
         )
         .first()
@@ -52,18 +75,24 @@ def update_agent(
 
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
+    _check_provider(payload.model_provider)
 
     agent.name = payload.name
     agent.system_prompt = payload.system_prompt
     agent.model_provider = payload.model_provider
     agent.model_name = payload.model_name
+    if payload.response_cache_enabled is not None:
+        agent.response_cache_enabled = payload.response_cache_enabled
+    if payload.response_cache_semantic is not None:
+        agent.response_cache_semantic = payload.response_cache_semantic
 
     db.commit()
     db.refresh(agent)
+    invalidate_agent(db, agent_id)
     return agent
 
 
-@router.delete("/projects/{project_id}/agents/{agent_id}")
+@router.delete("/projects/{project_id}/agents/{agent_id}", status_code=202)
 def delete_agent(
     project_id: str,
     agent_id: str,
@@ -76,6 +105,7 @@ def delete_agent(
         .filter(
             Agent.id == agent_id,
             Agent.project_id == project_id,
+            Agent.deleted_at.is_(None),
             Project.user_id == user.id,
         )
         .first()
@@ -84,7 +114,11 @@ def delete_agent(
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    db.delete(agent)
+    # hidden right away; conversations, messages and prompts are purged in the background
+    agent.deleted_at = utcnow()
+    job = request_deletion(db, user.id, "agent", agent_id)
     db.commit()
-    return {"ok": True}
+    invalidate_agent(db, agent_id)
+    deletion_worker.wake()
+    return {"ok": True, "job_id": job.id}
 
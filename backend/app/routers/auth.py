@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import secrets
 
-from app.core.deps import get_db, get_current_user
+from app.core.deps import get_db, get_async_db, get_current_user
+from app.core.principal_cache import CurrentUser, principal_cache
 from app.core.security import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
 )
-from app.core.email import send_email
+from app.services.mail_queue import enqueue_email, mail_worker
 
 
 from app.models.user import User
@@ -30,29 +33,37 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 # =========================
 
 @router.post("/register")
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
+async def register(payload: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    existing = (await db.scalars(select(User).where(User.email == payload.email))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user = User(
         email=payload.email,
         name=payload.name,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
 
     return {"id": user.id, "email": user.email, "name": user.name}
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.scalars(select(User).where(User.email == payload.email))).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    ok, new_hash = await verify_password_async(payload.password, user.password_hash)
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+
     token = create_access_token(user.id)
     return TokenResponse(access_token=token)
 
@@ -62,7 +73,7 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
 # =========================
 
 @router.get("/me")
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: CurrentUser = Depends(get_current_user)):
     return {
         "id": current_user.id,
         "name": current_user.name,
@@ -74,17 +85,19 @@ def get_me(current_user: User = Depends(get_current_user)):
 def update_me(
     payload: UserUpdateSchema,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    current_user.name = payload.name
-    current_user.email = payload.email
+    user = db.get(User, current_user.id)
+    user.name = payload.name
+    user.email = payload.email
     db.commit()
-    db.refresh(current_user)
+    db.refresh(user)
+    principal_cache.invalidate_user(user.id)
 
     return {
-        "id": current_user.id,
-        "name": current_user.name,
-        "email": current_user.email,
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
     }
 
 
@@ -95,9 +108,9 @@ def update_me(
 @router.post("/forgot-password")
 async def forgot_password(
     payload: ForgotPasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(User).filter(User.email == payload.email).first()
+    user = (await db.scalars(select(User).where(User.email == payload.email))).first()
 
     if not user:
         return {"ok": True}
@@ -105,11 +118,12 @@ async def forgot_password(
     token = secrets.token_urlsafe(32)
     user.reset_token = token
     user.reset_token_expires = datetime.utcnow() + timedelta(minutes=30)
-    db.commit()
 
     reset_link = f"http://localhost:3000/reset-password?token={token}"
 
-    await send_email(
+    # queued in the same transaction as the token; the mail worker sends it
+    enqueue_email(
+        db,
         subject="Reset your password",
         recipients=[user.email],
         body=f"""
@@ -123,21 +137,19 @@ Click below to reset your password:
 This link expires in 30 minutes.
 """,
     )
+    await db.commit()
+    mail_worker.wake()
 
     return {"ok": True}
 
 
 
 @router.post("/reset-password")
-def reset_password(
+async def reset_password(
     payload: ResetPasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = (
-        db.query(User)
-        .filter(User.reset_token == payload.token)
-        .first()
-    )
+    user = (await db.scalars(select(User).where(User.reset_token == payload.token))).first()
 
     if (
         not user
@@ -146,9 +158,10 @@ def reset_password(
     ):
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    user.password_hash = hash_password(payload.new_password)
+    user.password_hash = await hash_password_async(payload.new_password)
     user.reset_token = None
     user.reset_token_expires = None
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate_user(user.id)
 
     return {"ok": True}
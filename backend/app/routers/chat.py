@@ -1,75 +1,208 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from app.core.deps import get_db, get_current_user
+from starlette.background import BackgroundTask
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.deps import get_async_db, get_current_user_async
+from app.core.instrumentation import track_stream
 from app.models.agent import Agent
 from app.models.project import Project
-from app.models.prompt import Prompt
-from app.models.conversation import Conversation
-from app.models.message import Message
 from app.schemas.chat import ChatRequest
-from app.services.llm import openai_response
+from app.services.admission import admission
+from app.services.archive import rehydrate
+from app.services.context import estimate_tokens, token_budget
+from app.services.context_loader import history_within_budget, load_chat_context
+from app.services.file_store import resolve_files
+from app.services.llm import Usage
+from app.services.llm_router import llm_router, upstream_error
+from app.services.persistence import Turn, message_writer, persist_turn, utcnow
+from app.services.response_cache import cache_key, response_cache
+from app.services.retrieval import retrieval, with_passages
+from app.services.singleflight import coalescer
+from app.services.summaries import maybe_summarize, with_summary
+import asyncio
 import json
+import time
+import uuid
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-def ensure_agent_access(db: Session, agent_id: str, user_id: str) -> Agent:
-    agent = db.get(Agent, agent_id)
+@router.post("/agents/{agent_id}")
+async def chat(
+    agent_id: str,
+    payload: ChatRequest,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user_async),
+):
+    # agent, prompts, conversation and history window in one round-trip
+    ctx = await load_chat_context(db, agent_id, payload.conversation_id)
+    agent = ctx.agent
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
-    project = db.get(Project, agent.project_id)
-    if not project or project.user_id != user_id:
+    if agent.owner_id != user.id:
         raise HTTPException(status_code=403, detail="No access")
-    return agent
-
-@router.post("/agents/{agent_id}")
-async def chat(agent_id: str, payload: ChatRequest, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    agent = ensure_agent_access(db, agent_id, user.id)
 
-    # conversation
-    if payload.conversation_id:
-        conv = db.get(Conversation, payload.conversation_id)
-        if not conv or conv.user_id != user.id or conv.agent_id != agent.id:
-            raise HTTPException(status_code=404, detail="Conversation not found")
+    # conversation; nothing is written unless the reply actually starts
+    summary = ""
+    new_conversation = not payload.conversation_id
+    if new_conversation:
+        conv_id = str(uuid.uuid4())
     else:
-        conv = Conversation(agent_id=agent.id, user_id=user.id, title="New Chat")
-        db.add(conv)
-        db.commit()
-        db.refresh(conv)
-
-    # store user message
-    db.add(Message(conversation_id=conv.id, role="user", content=payload.message))
-    db.commit()
-
-    # load history (last 20)
-    history = (
-        db.query(Message)
-        .filter(Message.conversation_id == conv.id)
-        .order_by(Message.created_at.asc())
-        .limit(20)
-        .all()
+        conv_id = payload.conversation_id
+        # with write-behind the conversation may still be queued
+        owner = ctx.conversation or message_writer.pending_conversation(conv_id)
+        if not owner or owner.user_id != user.id or owner.agent_id != agent.id:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        if ctx.conversation and ctx.conversation.archived:
+            # reopened after archival: restore the messages, then reload the window
+            await db.run_sync(rehydrate, conv_id)
+            ctx = await load_chat_context(db, agent_id, conv_id)
+        if ctx.conversation:
+            summary = ctx.conversation.summary
+
+    # attachments must be the caller's registry entries; they join the
+    # agent's index in the background and are searched from their prepared
+    # chunks meanwhile, so nothing is extracted or embedded before the reply
+    files = await resolve_files(db, user.id, payload.file_ids)
+    retrieval.attach_in_background(agent.id, files)
+
+    turn = Turn(
+        conversation_id=conv_id,
+        user_id=user.id,
+        agent_id=agent.id,
+        user_content=payload.message,
+        new_conversation=new_conversation,
+        project_id=agent.project_id,
+        model=agent.model_name,
     )
+    user_msg = {"role": "user", "content": payload.message}
+
+    # most recent history after the rolling summary that fits the model's token budget
+    msgs = [user_msg]
+    if ctx.conversation:
+        budget = token_budget(agent.model_name) - estimate_tokens(payload.message)
+        history = await history_within_budget(db, ctx, budget)
+        msgs = history + message_writer.pending_messages(conv_id) + [user_msg]
+    elif not new_conversation:
+        msgs = message_writer.pending_messages(conv_id) + [user_msg]
+    system_prompt = with_summary(agent.system_prompt, summary)
+    system_prompt = with_passages(system_prompt, await retrieval.search(agent.id, payload.message, pending=files))
+
+    cached = None
+    if agent.response_cache_enabled:
+        cached = response_cache.lookup(
+            agent.id, agent.model_name, system_prompt, msgs, semantic=agent.response_cache_semantic
+        )
 
-    prompt_blocks = db.query(Prompt).filter(Prompt.agent_id == agent.id).all()
+    async def replay(answer: str):
+        yield answer
 
-    # build system prompt
-    system_prompt = agent.system_prompt + "\n\n"
-    for p in prompt_blocks:
-        system_prompt += f"[{p.type.upper()}] {p.title}\n{p.content}\n\n"
+    # one slot with the model per upstream call, then the first delta, so
+    # overload or upstream failure is a 503 rather than a stream that
+    # breaks after the headers went out
+    prompt_tokens = estimate_tokens(system_prompt) + sum(estimate_tokens(m["content"]) for m in msgs)
 
-    # format messages
-    msgs = [{"role": m.role, "content": m.content} for m in history]
+    async def upstream():
+        async with admission.slot(agent.model_provider, agent.model_name, user.id, prompt_tokens):
+            relay = await llm_router.start(
+                msgs, system_prompt, agent.model_name, agent.model_provider, prompt_tokens=prompt_tokens
+            )
+            try:
+                async for delta in relay:
+                    yield delta
+            finally:
+                await relay.aclose()
+
+    started = time.perf_counter()
+    if cached is not None:
+        source = replay(cached)
+    else:
+        # identical in-flight requests (e.g. starter questions) share one upstream call
+        key = None
+        if settings.LLM_COALESCE_ENABLED:
+            key = f"{agent.model_provider}:{cache_key(agent.id, agent.model_name, system_prompt, msgs)}"
+        try:
+            source = await coalescer.start(key, upstream)
+        except HTTPException:
+            raise
+        except Exception as exc:
+            # like an admission 503: nothing written, no conversation id to lose
+            raise upstream_error(exc) from exc
 
-    # minimal streaming via SSE style generator
+    # token-by-token streaming via SSE; the turn is persisted once, in one
+    # transaction, however the stream ends
     async def event_stream():
-        # call LLM (non-stream for stability)
-        answer = await openai_response(msgs, system_prompt, agent.model_name)
+        ttft_ms = None
+        parts: list[str] = []
+        is_cached = cached is not None
 
-        # store assistant message
-        db.add(Message(conversation_id=conv.id, role="assistant", content=answer))
-        db.commit()
+        try:
+            async for delta in source:
+                if isinstance(delta, Usage):
+                    turn.usage = delta
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = round((time.perf_counter() - started) * 1000, 1)
+                parts.append(delta)
+                yield f"data: {json.dumps({'conversation_id': conv_id, 'delta': delta, 'cached': is_cached})}\n\n"
+
+            answer = "".join(parts).strip()
+            total_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            if agent.response_cache_enabled and not is_cached and answer:
+                response_cache.store(
+                    agent.id, agent.model_name, system_prompt, msgs, answer, semantic=agent.response_cache_semantic
+                )
+
+            turn.assistant_content = answer
+            turn.assistant_at = utcnow()
+            turn.latency_ms = round(total_ms)
+            turn.ttft_ms = round(ttft_ms) if ttft_ms is not None else None
+        except Exception as exc:
+            # terminal frame, so a broken answer cannot pass for a complete one
+            error = upstream_error(exc).detail
+            yield f"data: {json.dumps({'conversation_id': conv_id, 'error': error, 'done': True})}\n\n"
+            raise
+        finally:
+            # conversation, user and (if finished) assistant message in one
+            # transaction; a client disconnect or cancellation lands here
+            # too, and must not drop the user's message
+            await asyncio.shield(persist_turn(turn))
+
+        yield f"data: {json.dumps({'conversation_id': conv_id, 'done': True, 'cached': is_cached, 'ttft_ms': ttft_ms, 'total_ms': total_ms})}\n\n"
+
+    return StreamingResponse(
+        track_stream(event_stream(), "cache" if cached is not None else "upstream"),
+        media_type="text/event-stream",
+        # fold older turns into the summary once the reply is out
+        background=BackgroundTask(maybe_summarize, conv_id),
+        # keep reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/agents/{agent_id}/cache/stats")
+async def cache_stats(
+    agent_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user_async),
+):
+    # counters are per agent; only its owner may read them
+    owned = await db.scalar(
+        select(Agent.id)
+        .join(Project)
+        .where(Agent.id == agent_id, Agent.deleted_at.is_(None), Project.user_id == user.id)
+    )
+    if not owned:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return response_cache.snapshot(agent_id)
 
-        # send to UI
-        yield f"data: {json.dumps({'conversation_id': conv.id, 'text': answer})}\n\n"
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+@router.get("/capacity")
+async def capacity(user=Depends(get_current_user_async)):
+    return {
+        "admission": admission.snapshot(),
+        "providers": llm_router.snapshot(),
+        "coalescing": coalescer.snapshot(),
+    }
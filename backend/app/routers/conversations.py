@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from app.core.deps import get_db, get_current_user
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT, paginate
+from app.models.agent import Agent
+from app.models.project import Project
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.schemas.conversation import ConversationOut, MessageOut
+from app.services.archive import rehydrate
+
+router = APIRouter(tags=["conversations"])
+
+@router.get("/agents/{agent_id}/conversations", response_model=list[ConversationOut])
+def list_conversations(
+    agent_id: str,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    The user's conversations with an agent, newest first.
+    """
+    agent = (
+        db.query(Agent.id)
+        .join(Project)
+        .filter(Agent.id == agent_id, Agent.deleted_at.is_(None), Project.user_id == user.id)
+        .first()
+    )
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    q = db.query(Conversation).filter(
+        Conversation.agent_id == agent_id,
+        Conversation.user_id == user.id,
+    )
+    return paginate(q, Conversation, response, cursor, limit, descending=True)
+
+@router.get("/conversations/{conversation_id}/messages", response_model=list[MessageOut])
+def list_messages(
+    conversation_id: str,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Messages of a conversation, newest first; follow X-Next-Cursor to load
+    older history.
+
+    Not read-only: an archived conversation is restored into the messages
+    table first (and stamped rehydrated_at, which keeps the archiver off it
+    for another ARCHIVE_INACTIVE_DAYS).
+    """
+    conv = (
+        db.query(Conversation)
+        .join(Agent, Agent.id == Conversation.agent_id)
+        .filter(Conversation.id == conversation_id, Agent.deleted_at.is_(None))
+        .first()
+    )
+    if not conv or conv.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    if conv.archived_at:
+        rehydrate(db, conversation_id)
+
+    q = db.query(Message).filter(Message.conversation_id == conversation_id)
+    return paginate(q, Message, response, cursor, limit, descending=True)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.core.deps import get_db, get_current_user
+from app.models.deletion_job import DeletionJob
+from app.schemas.deletion import DeletionJobOut
+
+router = APIRouter(prefix="/deletions", tags=["deletions"])
+
+@router.get("/{job_id}", response_model=DeletionJobOut)
+def get_deletion(job_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """
+    Progress of an agent or project deletion started by its DELETE endpoint.
+    """
+    job = db.get(DeletionJob, job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Deletion not found")
+    return job
@@ -1,24 +1,65 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from sqlalchemy.orm import Session
+import logging
+import time
 
-from app.core.deps import get_db, get_current_user
-from app.models.user import User
-from app.services.openai_files import upload_file_to_openai
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.deps import get_async_db, get_current_user_async
+from app.core.principal_cache import CurrentUser
+from app.services.file_store import register_upload
+from app.services.retrieval import retrieval
+from app.services.uploads import receive_upload
+
+log = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
-@router.post("/upload")
+_MULTIPART_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+@router.post("/upload", openapi_extra=_MULTIPART_BODY)
 async def upload(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user_async),
 ):
+    # body is parsed here (not by FastAPI) so size limits apply while streaming
+    received = await receive_upload(request, user.id)
     try:
-        # ✅ Upload to OpenAI Files API (or store locally if you want)
-        result = await upload_file_to_openai(file)
+        # stored by content hash; only new content goes to the OpenAI Files API
+        started = time.perf_counter()
+        stored, deduplicated = await register_upload(db, user.id, received)
+        upstream_seconds = time.perf_counter() - started
+        # extract, chunk and embed now, so chat turns that attach it only search
+        try:
+            await retrieval.prepare(stored)
+        except Exception:
+            log.warning("preparing %s for retrieval failed; it is prepared when attached", stored.id, exc_info=True)
         return {
-            "filename": file.filename,
-            "openai_file_id": result["id"],  # returned file ID
+            "filename": received.file.filename,
+            "file_id": stored.id,  # registry id, accepted in ChatRequest.file_ids
+            "openai_file_id": stored.provider_file_id,  # returned file ID
+            "sha256": stored.sha256,
+            "deduplicated": deduplicated,
+            "size_bytes": received.size,
+            "receive_mbps": received.throughput_mbps,
+            "upstream_mbps": round(received.size * 8 / 1_000_000 / upstream_seconds, 2) if upstream_seconds > 0 else 0.0,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await received.close()
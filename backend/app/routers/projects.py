@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.core.deps import get_db, get_current_user
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT, paginate
+from app.models.agent import Agent
 from app.models.project import Project
 from app.schemas.project import ProjectCreate, ProjectOut
+from app.services.agent_cache import invalidate_agents
+from app.services.deletion import deletion_worker, request_deletion, utcnow
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 @router.get("", response_model=list[ProjectOut])
-def list_projects(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    return db.query(Project).filter(Project.user_id == user.id).all()
+def list_projects(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    q = db.query(Project).filter(Project.user_id == user.id, Project.deleted_at.is_(None))
+    return paginate(q, Project, response, cursor, limit)
 
 @router.post("", response_model=ProjectOut)
 def create_project(payload: ProjectCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
@@ -17,3 +29,24 @@ def create_project(payload: ProjectCreate, db: Session = Depends(get_db), user=D
     db.commit()
     db.refresh(p)
     return p
+
+@router.delete("/{project_id}", status_code=202)
+def delete_project(project_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    project = db.get(Project, project_id)
+    if not project or project.user_id != user.id or project.deleted_at:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # the project and its agents disappear now; the rows are purged in the background
+    now = utcnow()
+    project.deleted_at = now
+    agent_ids = db.scalars(
+        update(Agent)
+        .where(Agent.project_id == project_id, Agent.deleted_at.is_(None))
+        .values(deleted_at=now)
+        .returning(Agent.id)
+    ).all()
+    job = request_deletion(db, user.id, "project", project_id)
+    db.commit()
+    invalidate_agents(db, list(agent_ids))
+    deletion_worker.wake()
+    return {"ok": True, "job_id": job.id}
@@ -1,22 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 from app.core.deps import get_db, get_current_user
-from app.models.agent import Agent
-from app.models.project import Project
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT, paginate
 from app.models.prompt import Prompt
 from app.schemas.prompt import PromptCreate, PromptOut
+from app.services.agent_cache import invalidate_agent
+from app.services.context_loader import ensure_agent_access
 
 router = APIRouter(tags=["prompts"])
 
-def ensure_agent_access(db: Session, agent_id: str, user_id: str) -> Agent:
-    agent = db.get(Agent, agent_id)
-    if not agent:
-        raise HTTPException(status_code=404, detail="Agent not found")
-    project = db.get(Project, agent.project_id)
-    if not project or project.user_id != user_id:
-        raise HTTPException(status_code=403, detail="No access")
-    return agent
-
 @router.post("/agents/{agent_id}/prompts", response_model=PromptOut)
 def create_prompt(agent_id: str, payload: PromptCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
     ensure_agent_access(db, agent_id, user.id)
@@ -24,9 +16,18 @@ def create_prompt(agent_id: str, payload: PromptCreate, db: Session = Depends(ge
     db.add(pr)
     db.commit()
     db.refresh(pr)
+    invalidate_agent(db, agent_id)
     return pr
 
 @router.get("/agents/{agent_id}/prompts", response_model=list[PromptOut])
-def list_prompts(agent_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def list_prompts(
+    agent_id: str,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
     ensure_agent_access(db, agent_id, user.id)
-    return db.query(Prompt).filter(Prompt.agent_id == agent_id).all()
+    q = db.query(Prompt).filter(Prompt.agent_id == agent_id)
+    return paginate(q, Prompt, response, cursor, limit)
@@ -0,0 +1,52 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.deps import get_async_db, get_current_user_async
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER
+from app.schemas.search import MessageHit
+from app.services.search import (
+    decode_search_cursor,
+    encode_search_cursor,
+    fallback_search,
+    fallback_snippet,
+    highlight,
+    postgres_search,
+)
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/messages", response_model=list[MessageHit])
+async def search_messages(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=256),
+    sort: Literal["relevance", "recent"] = "relevance",
+    agent_id: str | None = None,
+    project_id: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user_async),
+):
+    """
+    Full-text search over the caller's messages. `q` takes web search
+    syntax ("exact phrase", or, -exclude); follow X-Next-Cursor for more.
+    Outside Postgres every word must appear and results are newest first.
+    """
+    postgres = db.bind.dialect.name == "postgresql"
+    if not postgres:
+        sort = "recent"
+    after = decode_search_cursor(cursor, sort) if cursor else None
+
+    if postgres:
+        stmt = postgres_search(user.id, q, sort, after, limit, agent_id=agent_id, project_id=project_id)
+        rows = (await db.execute(stmt)).all()
+        hits = [{**r._mapping, "snippet": highlight(r.snippet)} for r in rows]
+    else:
+        stmt = fallback_search(user.id, q, after, limit, agent_id=agent_id, project_id=project_id)
+        rows = (await db.execute(stmt)).all()
+        hits = [{**r._mapping, "snippet": highlight(fallback_snippet(r.content, q))} for r in rows]
+
+    if len(rows) > limit:
+        rows, hits = rows[:limit], hits[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_search_cursor(sort, rows[-1])
+    return hits
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.deps import get_async_db, get_current_user_async
+from app.schemas.usage import UsageBucket
+from app.services.usage import default_window, fold, usage_query
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+@router.get("", response_model=list[UsageBucket])
+async def get_usage(
+    granularity: Literal["hour", "day"] = "hour",
+    group_by: Literal["project", "agent", "model"] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    project_id: str | None = None,
+    agent_id: str | None = None,
+    model: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user_async),
+):
+    """
+    The caller's token usage from the hourly rollups (last 24 hours by
+    default, 30 days for daily buckets), optionally grouped and filtered.
+    """
+    default_since, default_until = default_window(granularity)
+    q = usage_query(
+        user.id,
+        since or default_since,
+        until or default_until,
+        group_by=group_by,
+        project_id=project_id,
+        agent_id=agent_id,
+        model=model,
+    )
+    rows = (await db.execute(q)).all()
+    return fold(rows, granularity)
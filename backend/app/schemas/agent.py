@@ -5,6 +5,9 @@ class AgentCreate(BaseModel):
     system_prompt: str = "You are a helpful assistant."
     model_provider: str = "openai"
     model_name: str = "gpt-4o-mini"
+    # None keeps the current setting on update
+    response_cache_enabled: bool | None = None
+    response_cache_semantic: bool | None = None
 
 class AgentOut(BaseModel):
     id: str
@@ -12,3 +15,5 @@ class AgentOut(BaseModel):
     system_prompt: str
     model_provider: str
     model_name: str
+    response_cache_enabled: bool = False
+    response_cache_semantic: bool = False
@@ -4,4 +4,5 @@ from typing import Optional, List
 class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
     message: str
+    # registry file ids or provider (OpenAI) file ids owned by the user
     file_ids: List[str] = []
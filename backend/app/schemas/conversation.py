@@ -0,0 +1,19 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+class ConversationOut(BaseModel):
+    id: str
+    agent_id: str
+    title: str
+    created_at: datetime
+
+class MessageOut(BaseModel):
+    id: str
+    role: str
+    content: str
+    created_at: datetime
+    model: str | None = None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    cached_tokens: int | None = None
+    latency_ms: int | None = None
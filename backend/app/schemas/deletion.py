@@ -0,0 +1,16 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+class DeletionJobOut(BaseModel):
+    id: str
+    kind: str
+    target_id: str
+    status: str  # pending/done/failed
+    attempts: int
+    last_error: str | None = None
+    deleted_messages: int
+    deleted_conversations: int
+    deleted_prompts: int
+    deleted_agents: int
+    created_at: datetime
+    finished_at: datetime | None = None
@@ -0,0 +1,12 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+class MessageHit(BaseModel):
+    id: str
+    conversation_id: str
+    conversation_title: str
+    agent_id: str
+    role: str
+    created_at: datetime
+    snippet: str  # HTML-escaped, matches wrapped in <mark>
+    rank: float | None = None  # Postgres only
@@ -0,0 +1,11 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+class UsageBucket(BaseModel):
+    start: datetime
+    key: str | None = None  # project/agent/model id when grouped
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    avg_latency_ms: float | None = None
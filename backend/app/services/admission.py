@@ -0,0 +1,234 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+# =========================
+# Admission control in front of upstream LLM calls, one limiter per
+# "provider:model": a concurrency cap, an optional token-per-minute bucket
+# and a bounded wait queue served round-robin across users, so one heavy
+# user cannot starve the rest. A full queue is rejected immediately with a
+# 503 carrying the queue position and a Retry-After estimate.
+# Everything runs on the event loop, so no locks are needed.
+
+
+class Permit:
+    def __init__(self, limiter: "_Limiter"):
+        self._limiter = limiter
+        self._acquired = time.monotonic()
+        self._released = False
+
+    def release(self):
+        # idempotent: the stream's finally and its fallback may both call it
+        if self._released:
+            return
+        self._released = True
+        self._limiter._release(time.monotonic() - self._acquired)
+
+
+class _Waiter:
+    __slots__ = ("user_id", "tokens", "future")
+
+    def __init__(self, user_id: str, tokens: int, future: asyncio.Future):
+        self.user_id = user_id
+        self.tokens = tokens
+        self.future = future
+
+
+class _Limiter:
+    def __init__(self, key: str):
+        self.key = key
+        self.concurrency = settings.LLM_CONCURRENCY_LIMITS.get(key, settings.LLM_MAX_CONCURRENCY)
+        self.tpm = settings.LLM_TPM_LIMITS.get(key, settings.LLM_TOKENS_PER_MINUTE)
+        self.active = 0
+        self.bucket = float(self.tpm)
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0
+        # user id -> FIFO of waiters; the dict order is the round-robin order
+        self.queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self.queued = 0
+        self.hold_ewma = 1.0
+        self._timer: asyncio.TimerHandle | None = None
+
+    # ---- token bucket ----
+
+    def _refill(self):
+        if not self.tpm:
+            return
+        now = time.monotonic()
+        self.bucket = min(self.tpm, self.bucket + (now - self.refilled) * self.tpm / 60)
+        self.refilled = now
+
+    def _cost(self, tokens: int) -> int:
+        # a request larger than the whole budget would never be admitted
+        return min(tokens, self.tpm) if self.tpm else 0
+
+    # ---- admission ----
+
+    def _can_start(self, tokens: int) -> bool:
+        if self.active >= self.concurrency or time.monotonic() < self.paused_until:
+            return False
+        self._refill()
+        return self.bucket >= self._cost(tokens)
+
+    def _start(self, tokens: int) -> Permit:
+        self.active += 1
+        self.bucket -= self._cost(tokens)
+        return Permit(self)
+
+    def retry_after(self) -> int:
+        waves = (self.queued + 1) / max(1, self.concurrency)
+        wait = max(self.paused_until - time.monotonic(), waves * self.hold_ewma)
+        return max(1, math.ceil(wait))
+
+    def _reject(self, message: str, position: int):
+        raise HTTPException(
+            status_code=503,
+            detail={"message": message, "queue_position": position, "queue_length": self.queued},
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    async def acquire(self, user_id: str, tokens: int) -> Permit:
+        if not self.queued and self._can_start(tokens):
+            return self._start(tokens)
+
+        position = self.queued + 1
+        if self.queued >= settings.LLM_QUEUE_MAX:
+            self._reject("Model is at capacity, please retry", position)
+        user_queue = self.queues.get(user_id)
+        if user_queue is not None and len(user_queue) >= settings.LLM_QUEUE_MAX_PER_USER:
+            self._reject("Too many pending requests for this user", position)
+
+        waiter = _Waiter(user_id, tokens, asyncio.get_running_loop().create_future())
+        self.queues.setdefault(user_id, deque()).append(waiter)
+        self.queued += 1
+        self._schedule()
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), settings.LLM_QUEUE_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # granted while we gave up: hand the slot back
+                waiter.future.result().release()
+            else:
+                waiter.future.cancel()
+                self._forget(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                self._reject("Timed out waiting for model capacity", position)
+            raise
+
+    def try_acquire(self, tokens: int = 0) -> Permit | None:
+        """
+        Non-blocking extra slot (used for hedged requests), only when nobody is waiting.
+        """
+        if self.queued or not self._can_start(tokens):
+            return None
+        return self._start(tokens)
+
+    def _forget(self, waiter: _Waiter):
+        queue = self.queues.get(waiter.user_id)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.queued -= 1
+        if not queue:
+            del self.queues[waiter.user_id]
+
+    def _release(self, held: float):
+        self.active -= 1
+        self.hold_ewma = 0.8 * self.hold_ewma + 0.2 * held
+        self._dispatch()
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self._schedule()
+
+    # ---- fair dispatch ----
+
+    def _dispatch(self):
+        while self.queues:
+            user_id, queue = next(iter(self.queues.items()))
+            waiter = queue[0]
+            if not self._can_start(waiter.tokens):
+                self._schedule()
+                return
+            queue.popleft()
+            self.queued -= 1
+            # rotate: this user goes to the back of the line
+            del self.queues[user_id]
+            if queue:
+                self.queues[user_id] = queue
+            if not waiter.future.done():
+                waiter.future.set_result(self._start(waiter.tokens))
+
+    def _schedule(self):
+        """
+        Wakes the dispatcher when a pause ends or the bucket has refilled
+        enough for the head of the queue; releases wake it otherwise.
+        """
+        if self._timer is not None or not self.queues:
+            return
+        delay = self.paused_until - time.monotonic()
+        if self.tpm and self.active < self.concurrency:
+            head = next(iter(self.queues.values()))[0]
+            self._refill()
+            delay = max(delay, (self._cost(head.tokens) - self.bucket) * 60 / self.tpm)
+        if delay <= 0 and self.active >= self.concurrency:
+            return
+        self._timer = asyncio.get_running_loop().call_later(max(delay, 0.0), self._wake)
+
+    def _wake(self):
+        self._timer = None
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "concurrency": self.concurrency,
+            "queued": self.queued,
+            "tokens_available": round(self.bucket) if self.tpm else None,
+            "paused_for_s": round(max(0.0, self.paused_until - time.monotonic()), 1),
+        }
+
+
+class AdmissionController:
+    def __init__(self):
+        self._limiters: dict[str, _Limiter] = {}
+
+    def limiter(self, provider: str, model: str) -> _Limiter:
+        key = f"{provider}:{model}"
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = _Limiter(key)
+        return limiter
+
+    async def acquire(self, provider: str, model: str, user_id: str, prompt_tokens: int) -> Permit:
+        tokens = prompt_tokens + settings.LLM_OUTPUT_TOKENS_ESTIMATE
+        return await self.limiter(provider, model).acquire(user_id, tokens)
+
+    def try_acquire(self, provider: str, model: str, tokens: int = 0) -> Permit | None:
+        return self.limiter(provider, model).try_acquire(tokens)
+
+    def pause(self, provider: str, model: str, seconds: float):
+        """
+        Holds queued requests back after the upstream asked us to (429 Retry-After).
+        """
+        self.limiter(provider, model).pause(seconds)
+
+    @asynccontextmanager
+    async def slot(self, provider: str, model: str, user_id: str, prompt_tokens: int):
+        permit = await self.acquire(provider, model, user_id, prompt_tokens)
+        try:
+            yield permit
+        finally:
+            permit.release()
+
+    def snapshot(self) -> dict:
+        return {key: limiter.snapshot() for key, limiter in self._limiters.items()}
+
+
+admission = AdmissionController()
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "agent_cache"
+# comma-separated ids per NOTIFY; Postgres caps a payload at 8000 bytes
+NOTIFY_IDS_PER_PAYLOAD = 200
+
+
+@dataclass(frozen=True)
+class CompiledAgent:
+    id: str
+    project_id: str
+    owner_id: str
+    model_provider: str
+    model_name: str
+    system_prompt: str
+    response_cache_enabled: bool
+    response_cache_semantic: bool
+    version: int
+
+
+def render_system_prompt(base: str, prompt_blocks) -> str:
+    system_prompt = base + "\n\n"
+    for p in prompt_blocks:
+        system_prompt += f"[{p.type.upper()}] {p.title}\n{p.content}\n\n"
+    return system_prompt
+
+
+class _AgentCache:
+    """
+    LRU + TTL cache of compiled agents. Each agent id has a version stamp
+    that moves forward on invalidation, so a load that raced with a write is
+    never stored.
+
+    Stamps come from one counter. Only the most recently invalidated ids
+    keep their own stamp; the rest share a floor that is raised to the stamp
+    of every id dropped from that list, so the bookkeeping stays bounded and
+    an agent's stamp still never moves backwards.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[float, CompiledAgent]] = OrderedDict()
+        self._versions: OrderedDict[str, int] = OrderedDict()
+        self._counter = 0
+        self._floor = 0
+        # invalidations come from sync routes running in the threadpool
+        self._lock = threading.Lock()
+
+    def version(self, agent_id: str) -> int:
+        return self._versions.get(agent_id, self._floor)
+
+    def get(self, agent_id: str) -> CompiledAgent | None:
+        with self._lock:
+            item = self._items.get(agent_id)
+            if item is None:
+                return None
+            stored_at, compiled = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self._items[agent_id]
+                return None
+            self._items.move_to_end(agent_id)
+            return compiled
+
+    def put(self, compiled: CompiledAgent):
+        with self._lock:
+            if compiled.version != self.version(compiled.id):
+                return
+            self._items[compiled.id] = (time.monotonic(), compiled)
+            self._items.move_to_end(compiled.id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, agent_id: str):
+        with self._lock:
+            self._counter += 1
+            self._versions[agent_id] = self._counter
+            self._versions.move_to_end(agent_id)
+            while len(self._versions) > self.maxsize:
+                _, stamp = self._versions.popitem(last=False)
+                self._floor = max(self._floor, stamp)
+            self._items.pop(agent_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._counter += 1
+            self._floor = self._counter
+            self._versions.clear()
+            self._items.clear()
+
+
+agent_cache = _AgentCache(settings.AGENT_CACHE_SIZE, settings.AGENT_CACHE_TTL_SECONDS)
+
+
+def invalidate_agents(db: Session, agent_ids: list[str]):
+    """
+    Drops the agents locally and, on Postgres, tells other workers via
+    NOTIFY, in one commit however many ids there are. Call after the write
+    has been committed.
+    """
+    for agent_id in agent_ids:
+        agent_cache.invalidate(agent_id)
+    if agent_ids and db.get_bind().dialect.name == "postgresql":
+        for i in range(0, len(agent_ids), NOTIFY_IDS_PER_PAYLOAD):
+            payload = ",".join(agent_ids[i:i + NOTIFY_IDS_PER_PAYLOAD])
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+        db.commit()
+
+
+def invalidate_agent(db: Session, agent_id: str):
+    invalidate_agents(db, [agent_id])
+
+
+async def listen_for_invalidations():
+    """
+    Long-running task: LISTEN on the invalidation channel and drop
+    agents changed by other workers. Reconnects with backoff.
+    """
+    import psycopg
+
+    url = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+    delay = 1.0
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(url, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # anything may have changed while we were disconnected
+                agent_cache.clear()
+                delay = 1.0
+                async for notify in conn.notifies():
+                    for agent_id in notify.payload.split(","):
+                        agent_cache.invalidate(agent_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.warning("agent cache listener disconnected, retrying in %.0fs", delay, exc_info=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
@@ -0,0 +1,166 @@
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, exists, insert, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.models.archive import ConversationArchive
+from app.models.conversation import Conversation
+from app.models.message import Message
+
+CODEC = "zlib+json"
+# every stored column except the search vector and the owner copy, which
+# are filled back in on rehydration
+COLUMNS = (
+    "id", "role", "content", "created_at",
+    "model", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms", "ttft_ms",
+)
+CHUNK = 1000
+
+# Sync Session throughout: the archive command runs it directly and async
+# callers go through AsyncSession.run_sync, so there is one implementation.
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(ts: datetime) -> datetime:
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _idle(cutoff: datetime):
+    """
+    No message since `cutoff` and not restored from the archive since
+    either; rehydrated messages keep their old timestamps.
+    """
+    recent = exists().where(Message.conversation_id == Conversation.id, Message.created_at >= cutoff)
+    return ~recent & or_(Conversation.rehydrated_at.is_(None), Conversation.rehydrated_at < cutoff)
+
+
+def _locked(q, db: Session):
+    # SKIP LOCKED lets concurrent archivers split the work; SQLite has no row locks
+    if db.get_bind().dialect.name == "postgresql":
+        return q.with_for_update(skip_locked=True)
+    return q
+
+
+def encode(rows: list[dict]) -> tuple[bytes, int]:
+    raw = json.dumps(rows, separators=(",", ":"), default=lambda v: v.isoformat()).encode()
+    return zlib.compress(raw, 6), len(raw)
+
+
+def decode(codec: str, payload: bytes) -> list[dict]:
+    if codec != CODEC:
+        raise ValueError(f"unknown archive codec {codec!r}")
+    rows = json.loads(zlib.decompress(payload))
+    for r in rows:
+        r["created_at"] = datetime.fromisoformat(r["created_at"])
+    return rows
+
+
+def inactive_conversations(db: Session, cutoff: datetime, limit: int, after: tuple | None = None) -> list:
+    """
+    One keyset page of (created_at, id) of live conversations idle since
+    `cutoff`; each check is one probe of ix_messages_conversation_id_created_at.
+    """
+    q = select(Conversation.created_at, Conversation.id).where(
+        Conversation.archived_at.is_(None), Conversation.created_at < cutoff, _idle(cutoff)
+    )
+    if after:
+        q = q.where(tuple_(Conversation.created_at, Conversation.id) > tuple_(*after))
+    return db.execute(q.order_by(Conversation.created_at, Conversation.id).limit(limit)).all()
+
+
+def archive_conversation(db: Session, conversation_id: str, cutoff: datetime) -> int | None:
+    """
+    Moves one conversation's messages into a compressed archive row and
+    commits. Returns the number of messages archived, or None when the
+    conversation was taken by another archiver or became active again.
+    """
+    conv = db.scalars(_locked(
+        select(Conversation).where(
+            Conversation.id == conversation_id, Conversation.archived_at.is_(None), _idle(cutoff)
+        ),
+        db,
+    )).first()
+    if conv is None:
+        db.rollback()
+        return None
+
+    rows = [
+        dict(r._mapping)
+        for r in db.execute(
+            select(*(getattr(Message, c) for c in COLUMNS))
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at, Message.id)
+        )
+    ]
+    payload, raw_bytes = encode(rows)
+    db.add(ConversationArchive(
+        conversation_id=conversation_id,
+        codec=CODEC,
+        payload=payload,
+        message_count=len(rows),
+        raw_bytes=raw_bytes,
+        first_message_at=rows[0]["created_at"] if rows else None,
+        last_message_at=rows[-1]["created_at"] if rows else None,
+    ))
+    # by id, so a turn written meanwhile stays in place and is merged on rehydration
+    ids = [r["id"] for r in rows]
+    for i in range(0, len(ids), CHUNK):
+        db.execute(delete(Message).where(Message.id.in_(ids[i:i + CHUNK])))
+    conv.archived_at = _now()
+    db.commit()
+    return len(rows)
+
+
+def rehydrate(db: Session, conversation_id: str) -> int:
+    """
+    Puts an archived conversation's messages back and drops the archive
+    row, in one transaction. Safe to race: the loser finds nothing left.
+    """
+    archive = db.scalars(
+        select(ConversationArchive)
+        .where(ConversationArchive.conversation_id == conversation_id)
+        .with_for_update()
+    ).first()
+    restored = update(Conversation).where(Conversation.id == conversation_id).values(
+        archived_at=None, rehydrated_at=_now()
+    )
+    if archive is None:
+        db.execute(restored)
+        db.commit()
+        return 0
+
+    user_id = db.scalar(select(Conversation.user_id).where(Conversation.id == conversation_id))
+    rows = decode(archive.codec, archive.payload)
+    for r in rows:
+        r["conversation_id"] = conversation_id
+        r["user_id"] = user_id
+    for i in range(0, len(rows), CHUNK):
+        db.execute(insert(Message), rows[i:i + CHUNK])
+    db.delete(archive)
+    db.execute(restored)
+    db.commit()
+    return len(rows)
+
+
+def archived_messages(db: Session, since: datetime, until: datetime):
+    """
+    Yields (conversation_id, message) for archived messages created in
+    [since, until), for jobs that rebuild state from message history.
+    """
+    q = select(ConversationArchive).where(
+        ConversationArchive.first_message_at < until,
+        ConversationArchive.last_message_at >= since,
+    ).execution_options(yield_per=100)
+    for archive in db.scalars(q):
+        for r in decode(archive.codec, archive.payload):
+            if since <= _aware(r["created_at"]) < until:
+                yield archive.conversation_id, r
+
+
+def default_cutoff(days: int) -> datetime:
+    return _now() - timedelta(days=days)
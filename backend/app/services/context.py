@@ -0,0 +1,88 @@
+from sqlalchemy import select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.message import Message
+
+# rows fetched per round-trip while walking history newest-first
+PAGE_SIZE = 50
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 chars/token plus per-message overhead).
+    Close enough for budgeting without a tokenizer dependency.
+    """
+    return len(text) // 4 + 4
+
+
+def token_budget(model: str) -> int:
+    return settings.CONTEXT_TOKEN_BUDGETS.get(model, settings.CONTEXT_TOKEN_BUDGET)
+
+
+def after_cursor(created_at, message_id: str):
+    return or_(
+        Message.created_at > created_at,
+        and_(Message.created_at == created_at, Message.id > message_id),
+    )
+
+
+def fit_budget(rows, budget: int, picked: list[dict], used: int) -> tuple[int, bool]:
+    """
+    Appends newest-first `rows` to `picked` while they fit in `budget`; a
+    message that alone exceeds what is left ends the walk rather than
+    overshooting it. Returns the new token total and whether the budget ran out.
+    """
+    for row in rows:
+        cost = estimate_tokens(row.content)
+        if used + cost > budget:
+            return used, True
+        picked.append({"role": row.role, "content": row.content})
+        used += cost
+    return used, False
+
+
+async def build_history(
+    db: AsyncSession,
+    conversation_id: str,
+    budget: int,
+    after: tuple | None = None,
+    before: tuple | None = None,
+) -> list[dict]:
+    """
+    Returns the most recent messages of a conversation that fit in `budget`
+    tokens, in chronological order (possibly none of them).
+    Walks the (conversation_id, created_at) index newest-first in pages.
+    `after` is a (created_at, id) cursor; older messages (e.g. already
+    folded into the conversation summary) are skipped. `before` resumes a
+    walk that was started elsewhere.
+    """
+    picked: list[dict] = []
+    used = 0
+    cursor = before
+
+    while True:
+        stmt = (
+            select(Message.id, Message.role, Message.content, Message.created_at)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(PAGE_SIZE)
+        )
+        if after is not None:
+            stmt = stmt.where(after_cursor(*after))
+        if cursor is not None:
+            created_at, mid = cursor
+            stmt = stmt.where(
+                or_(
+                    Message.created_at < created_at,
+                    and_(Message.created_at == created_at, Message.id < mid),
+                )
+            )
+
+        rows = (await db.execute(stmt)).all()
+        used, exhausted = fit_budget(rows, budget, picked, used)
+        if exhausted or len(rows) < PAGE_SIZE:
+            break
+        cursor = (rows[-1].created_at, rows[-1].id)
+
+    picked.reverse()
+    return picked
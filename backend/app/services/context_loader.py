@@ -0,0 +1,237 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import Boolean, DateTime, String, cast, func, literal, null, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.agent import Agent
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.project import Project
+from app.models.prompt import Prompt
+from app.services.agent_cache import CompiledAgent, agent_cache, render_system_prompt
+from app.services.context import PAGE_SIZE, build_history, fit_budget
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def ensure_agent_access(db: Session, agent_id: str, user_id: str) -> Agent:
+    """
+    Agent lookup and ownership check in one query.
+    """
+    row = (
+        db.query(Agent, Project.user_id)
+        .join(Project, Project.id == Agent.project_id)
+        .filter(Agent.id == agent_id, Agent.deleted_at.is_(None))
+        .first()
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    agent, owner_id = row
+    if owner_id != user_id:
+        raise HTTPException(status_code=403, detail="No access")
+    return agent
+
+
+@dataclass(frozen=True)
+class ConversationRow:
+    id: str
+    user_id: str
+    agent_id: str
+    summary: str
+    summary_cursor: tuple | None
+    archived: bool = False
+
+
+@dataclass
+class ChatContext:
+    agent: CompiledAgent | None
+    conversation: ConversationRow | None
+    # newest-first history rows after the summary cursor (at most PAGE_SIZE)
+    history_rows: list
+
+
+# The parts of the batch are unioned, so each is laid out onto one shared
+# shape of text, timestamp and flag slots. _LAYOUT names the slots per kind;
+# _part() places named columns onto them and _named() reads a row back.
+_LAYOUT = {
+    "agent": (
+        ("owner_id", "system_prompt", "model_provider", "model_name", "project_id"),
+        None,
+        ("response_cache_enabled", "response_cache_semantic"),
+    ),
+    "prompt": (("type", "title", "content"), "created_at", ()),
+    "conv": (("user_id", "agent_id", "summary", "summary_message_id"), "summary_message_at", ("archived",)),
+    "msg": (("role", "content"), "created_at", ()),
+}
+_TEXT_SLOTS = max(len(texts) for texts, _, _ in _LAYOUT.values())
+_FLAG_SLOTS = max(len(flags) for _, _, flags in _LAYOUT.values())
+
+
+def _part(kind: str, id_, **columns):
+    texts, ts, flags = _LAYOUT[kind]
+
+    def slot(name, type_):
+        value = columns.get(name) if name else None
+        if value is None:
+            return null().cast(type_)
+        return cast(value, String) if type_ is String else value
+
+    return (
+        literal(kind, String).label("kind"),
+        cast(id_, String).label("id"),
+        *(slot(texts[i] if i < len(texts) else None, String).label(f"text{i}") for i in range(_TEXT_SLOTS)),
+        slot(ts, DateTime(timezone=True)).label("ts"),
+        *(slot(flags[i] if i < len(flags) else None, Boolean).label(f"flag{i}") for i in range(_FLAG_SLOTS)),
+    )
+
+
+def _named(row) -> SimpleNamespace:
+    texts, ts, flags = _LAYOUT[row.kind]
+    values = {"id": row.id}
+    values.update((name, getattr(row, f"text{i}")) for i, name in enumerate(texts))
+    if ts:
+        values[ts] = row.ts
+    values.update((name, getattr(row, f"flag{i}")) for i, name in enumerate(flags))
+    return SimpleNamespace(**values)
+
+
+def _batch(agent_id: str, conversation_id: str | None, with_agent: bool):
+    parts = []
+    if with_agent:
+        parts.append(
+            select(*_part(
+                "agent", Agent.id,
+                owner_id=Project.user_id,
+                system_prompt=Agent.system_prompt,
+                model_provider=Agent.model_provider,
+                model_name=Agent.model_name,
+                project_id=Agent.project_id,
+                response_cache_enabled=Agent.response_cache_enabled,
+                response_cache_semantic=Agent.response_cache_semantic,
+            ))
+            .join(Project, Project.id == Agent.project_id)
+            .where(Agent.id == agent_id, Agent.deleted_at.is_(None))
+        )
+        parts.append(
+            select(*_part(
+                "prompt", Prompt.id,
+                type=Prompt.type, title=Prompt.title, content=Prompt.content, created_at=Prompt.created_at,
+            ))
+            .where(Prompt.agent_id == agent_id)
+        )
+
+    if conversation_id:
+        parts.append(
+            select(*_part(
+                "conv", Conversation.id,
+                user_id=Conversation.user_id,
+                agent_id=Conversation.agent_id,
+                summary=Conversation.summary,
+                summary_message_id=Conversation.summary_message_id,
+                summary_message_at=Conversation.summary_message_at,
+                archived=Conversation.archived_at.is_not(None),
+            ))
+            .where(Conversation.id == conversation_id)
+        )
+
+        # history window after the summary cursor, resolved inside the statement
+        summary = select(Conversation.summary_message_at, Conversation.summary_message_id).where(
+            Conversation.id == conversation_id
+        )
+        cursor_at = func.coalesce(summary.with_only_columns(Conversation.summary_message_at).scalar_subquery(), _EPOCH)
+        cursor_id = func.coalesce(summary.with_only_columns(Conversation.summary_message_id).scalar_subquery(), "")
+        window = (
+            select(Message.id, Message.role, Message.content, Message.created_at)
+            .where(
+                Message.conversation_id == conversation_id,
+                tuple_(Message.created_at, Message.id) > tuple_(cursor_at, cursor_id),
+            )
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(PAGE_SIZE)
+            .subquery()
+        )
+        parts.append(select(*_part(
+            "msg", window.c.id, role=window.c.role, content=window.c.content, created_at=window.c.created_at,
+        )))
+
+    return union_all(*parts)
+
+
+async def load_chat_context(db: AsyncSession, agent_id: str, conversation_id: str | None) -> ChatContext:
+    """
+    Loads the compiled agent (unless cached), the conversation and the
+    newest history window in a single statement.
+    """
+    agent = agent_cache.get(agent_id)
+    version = agent_cache.version(agent_id)
+
+    if agent is None or conversation_id:
+        rows = (await db.execute(_batch(agent_id, conversation_id, with_agent=agent is None))).all()
+    else:
+        rows = []
+
+    agent_row, conv_row, prompts, history = None, None, [], []
+    for row in rows:
+        r = _named(row)
+        if row.kind == "agent":
+            agent_row = r
+        elif row.kind == "prompt":
+            prompts.append(r)
+        elif row.kind == "conv":
+            conv_row = r
+        else:
+            history.append(r)
+
+    if agent is None and agent_row is not None:
+        prompts.sort(key=lambda p: (p.created_at, p.id))
+        agent = CompiledAgent(
+            id=agent_row.id,
+            project_id=agent_row.project_id,
+            owner_id=agent_row.owner_id,
+            model_provider=agent_row.model_provider,
+            model_name=agent_row.model_name,
+            system_prompt=render_system_prompt(agent_row.system_prompt, prompts),
+            response_cache_enabled=bool(agent_row.response_cache_enabled),
+            response_cache_semantic=bool(agent_row.response_cache_semantic),
+            version=version,
+        )
+        agent_cache.put(agent)
+
+    conversation = None
+    if conv_row is not None:
+        conversation = ConversationRow(
+            id=conv_row.id,
+            user_id=conv_row.user_id,
+            agent_id=conv_row.agent_id,
+            summary=conv_row.summary or "",
+            summary_cursor=(
+                (conv_row.summary_message_at, conv_row.summary_message_id) if conv_row.summary_message_id else None
+            ),
+            archived=bool(conv_row.archived),
+        )
+
+    history.sort(key=lambda m: (m.created_at, m.id), reverse=True)
+    return ChatContext(agent=agent, conversation=conversation, history_rows=history)
+
+
+async def history_within_budget(db: AsyncSession, ctx: ChatContext, budget: int) -> list[dict]:
+    """
+    Trims the prefetched window to `budget`; only conversations whose
+    window was full and under budget need another round-trip.
+    """
+    picked: list[dict] = []
+    used, exhausted = fit_budget(ctx.history_rows, budget, picked, 0)
+    picked.reverse()
+
+    if not exhausted and len(ctx.history_rows) == PAGE_SIZE and used < budget:
+        oldest = ctx.history_rows[-1]
+        older = await build_history(
+            db, ctx.conversation.id, budget - used,
+            after=ctx.conversation.summary_cursor, before=(oldest.created_at, oldest.id),
+        )
+        picked = older + picked
+    return picked
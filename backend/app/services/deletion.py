@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.agent import Agent
+from app.models.archive import ConversationArchive
+from app.models.conversation import Conversation
+from app.models.deletion_job import DeletionJob
+from app.models.message import Message
+from app.models.project import Project
+from app.models.prompt import Prompt
+from app.services.agent_cache import agent_cache
+from app.services.response_cache import response_cache
+from app.services.retrieval import retrieval
+
+log = logging.getLogger(__name__)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def request_deletion(db: Session, user_id: str, kind: str, target_id: str) -> DeletionJob:
+    """
+    Queues the purge as part of the caller's transaction, which should also
+    set deleted_at on the target; the worker picks it up after the commit.
+    """
+    job = DeletionJob(
+        user_id=user_id,
+        kind=kind,
+        target_id=target_id,
+        status="pending",
+        attempts=0,
+        next_attempt_at=utcnow(),
+        deleted_messages=0,
+        deleted_conversations=0,
+        deleted_prompts=0,
+        deleted_agents=0,
+    )
+    db.add(job)
+    return job
+
+
+class _Purge:
+    """
+    Deletes children bottom-up in short transactions of at most
+    DELETION_BATCH_SIZE rows, each committed together with the job's
+    progress counters and a lease extension. Idempotent: a retried job just
+    continues with whatever is left.
+    """
+
+    def __init__(self, db: AsyncSession, job_id: str):
+        self.db = db
+        self.job_id = job_id
+        self.batch = settings.DELETION_BATCH_SIZE
+
+    async def _commit(self, counter: str | None = None, n: int = 0):
+        lease = utcnow() + timedelta(seconds=settings.DELETION_LEASE_SECONDS)
+        values = {"next_attempt_at": lease}
+        if n:
+            values[counter] = getattr(DeletionJob, counter) + n
+        await self.db.execute(update(DeletionJob).where(DeletionJob.id == self.job_id).values(**values))
+        await self.db.commit()
+        if settings.DELETION_BATCH_PAUSE_MS:
+            await asyncio.sleep(settings.DELETION_BATCH_PAUSE_MS / 1000)
+
+    async def _drain(self, model, ids, counter: str):
+        """
+        DELETE ... WHERE id IN (<next batch of ids>) until nothing is left.
+        """
+        while True:
+            result = await self.db.execute(
+                delete(model)
+                .where(model.id.in_(ids.limit(self.batch).scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            )
+            await self._commit(counter, result.rowcount)
+            if result.rowcount < self.batch:
+                return
+
+    async def agent(self, agent_id: str):
+        conversations = select(Conversation.id).where(Conversation.agent_id == agent_id)
+        await self._drain(
+            Message,
+            select(Message.id).where(Message.conversation_id.in_(conversations.scalar_subquery())),
+            "deleted_messages",
+        )
+
+        # archived conversations carry their messages in one row each
+        while True:
+            archives = (await self.db.execute(
+                select(ConversationArchive.conversation_id, ConversationArchive.message_count)
+                .where(ConversationArchive.conversation_id.in_(conversations.scalar_subquery()))
+                .limit(self.batch)
+            )).all()
+            if not archives:
+                break
+            await self.db.execute(
+                delete(ConversationArchive)
+                .where(ConversationArchive.conversation_id.in_([a.conversation_id for a in archives]))
+                .execution_options(synchronize_session=False)
+            )
+            await self._commit("deleted_messages", sum(a.message_count for a in archives))
+
+        await self._drain(Conversation, conversations, "deleted_conversations")
+        await self._drain(Prompt, select(Prompt.id).where(Prompt.agent_id == agent_id), "deleted_prompts")
+
+        await self.db.execute(delete(Agent).where(Agent.id == agent_id).execution_options(synchronize_session=False))
+        await self._commit("deleted_agents", 1)
+        agent_cache.invalidate(agent_id)
+        response_cache.forget(agent_id)
+        await retrieval.delete(agent_id)
+
+    async def project(self, project_id: str):
+        agent_ids = (await self.db.scalars(select(Agent.id).where(Agent.project_id == project_id))).all()
+        for agent_id in agent_ids:
+            await self.agent(agent_id)
+        await self.db.execute(
+            delete(Project).where(Project.id == project_id).execution_options(synchronize_session=False)
+        )
+        await self._commit()
+
+
+class DeletionWorker:
+    """
+    Runs queued deletion jobs one at a time: claims a job (SKIP LOCKED on
+    Postgres, with a lease the purge keeps extending) and retries failures
+    with exponential backoff.
+    """
+
+    def __init__(self):
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def wake(self):
+        # called from sync endpoints running in the threadpool
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while True:
+            try:
+                ran = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("deletion worker iteration failed")
+                ran = False
+            if ran:
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.DELETION_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> DeletionJob | None:
+        async with AsyncSessionLocal() as db:
+            now = utcnow()
+            job = (
+                await db.scalars(
+                    select(DeletionJob)
+                    .where(DeletionJob.status == "pending", DeletionJob.next_attempt_at <= now)
+                    .order_by(DeletionJob.next_attempt_at)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                )
+            ).first()
+            if job is not None:
+                job.next_attempt_at = now + timedelta(seconds=settings.DELETION_LEASE_SECONDS)
+            await db.commit()
+            return job
+
+    async def run_once(self) -> bool:
+        """
+        Runs one claimed job to completion or failure; False when idle.
+        """
+        job = await self._claim()
+        if job is None:
+            return False
+
+        values = {"attempts": job.attempts + 1}
+        async with AsyncSessionLocal() as db:
+            purge = _Purge(db, job.id)
+            try:
+                if job.kind == "project":
+                    await purge.project(job.target_id)
+                else:
+                    await purge.agent(job.target_id)
+                values.update(status="done", finished_at=utcnow(), last_error=None)
+            except Exception as e:
+                await db.rollback()
+                log.warning("deletion job %s failed (attempt %d)", job.id, values["attempts"], exc_info=True)
+                values["last_error"] = str(e)[:500]
+                if values["attempts"] >= settings.DELETION_MAX_ATTEMPTS:
+                    values.update(status="failed", finished_at=utcnow())
+                else:
+                    backoff = min(2 ** values["attempts"], 3600) * (0.5 + random.random())
+                    values["next_attempt_at"] = utcnow() + timedelta(seconds=backoff)
+            await db.execute(update(DeletionJob).where(DeletionJob.id == job.id).values(**values))
+            await db.commit()
+        return True
+
+
+deletion_worker = DeletionWorker()
+
@@ -0,0 +1,80 @@
+import hashlib
+import re
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.http_clients import get_client
+
+OPENAI_EMBEDDINGS_URL = settings.OPENAI_BASE_URL.rstrip("/") + "/embeddings"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder: word unigrams/bigrams and character
+    trigrams hashed into a fixed-size, L2-normalised vector. No network,
+    no model weights; good enough to rank chunks for retrieval.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> list[str]:
+        words = _TOKEN_RE.findall(text.lower())
+        feats = list(words)
+        feats += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"#{w}#"
+            feats += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return feats
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for f in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        # hashing every feature of a document is CPU work; keep it off the loop
+        return await run_in_threadpool(self.embed, texts)
+
+
+class OpenAIEmbedder:
+    """
+    Embeddings API backed embedder; vectors are L2-normalised like the
+    local one so both can share the same index code.
+    """
+
+    def __init__(self, model: str, dim: int, batch_size: int = 256):
+        self.model = model
+        self.dim = dim
+        self.batch_size = batch_size
+        self.name = f"openai-{model}-{dim}"
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            payload = {"model": self.model, "input": texts[i:i + self.batch_size], "dimensions": self.dim}
+            r = await get_client("llm").post(OPENAI_EMBEDDINGS_URL, json=payload, headers=headers)
+            r.raise_for_status()
+            out += [d["embedding"] for d in sorted(r.json()["data"], key=lambda d: d["index"])]
+        vecs = np.asarray(out, dtype=np.float32).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vecs / norms
+
+
+def get_embedder():
+    """
+    Embedder for retrieval, chosen by RETRIEVAL_EMBEDDER ("hashing" or "openai").
+    """
+    if settings.RETRIEVAL_EMBEDDER == "openai":
+        return OpenAIEmbedder(settings.RETRIEVAL_OPENAI_MODEL, settings.RETRIEVAL_EMBED_DIM)
+    return HashingEmbedder(settings.RETRIEVAL_EMBED_DIM)
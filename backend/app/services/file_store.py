@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import os
+import tempfile
+from typing import BinaryIO
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.file import File
+from app.services.openai_files import delete_openai_file, upload_file_to_openai
+from app.services.uploads import ReceivedUpload
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(settings.FILE_STORE_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def _store_blob(src: BinaryIO) -> tuple[str, int, str]:
+    """
+    Copies `src` into the content-addressed store while hashing it.
+    Returns (sha256, size, path); identical content is stored once.
+    """
+    os.makedirs(settings.FILE_STORE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    src.seek(0)
+    fd, tmp = tempfile.mkstemp(dir=settings.FILE_STORE_DIR, prefix=".incoming-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+        sha = digest.hexdigest()
+        path = blob_path(sha)
+        if os.path.exists(path):
+            os.remove(tmp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+        return sha, size, path
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+async def register_upload(db: AsyncSession, owner_id: str, upload: ReceivedUpload) -> tuple[File, bool]:
+    """
+    Stores an upload by content hash. Returns (file, deduplicated); content
+    the caller already uploaded makes no upstream call. Provider files are
+    never shared between owners, so one user's upload cannot reveal that
+    another user holds the same bytes.
+    """
+    sha, size, path = await run_in_threadpool(_store_blob, upload.file.file)
+
+    existing = (await db.scalars(select(File).where(File.owner_id == owner_id, File.sha256 == sha))).first()
+    if existing:
+        return existing, True
+
+    fh = await run_in_threadpool(open, path, "rb")
+    try:
+        result = await upload_file_to_openai(upload.file.filename, fh, upload.file.content_type)
+    finally:
+        await run_in_threadpool(fh.close)
+    provider_file_id = result["id"]
+
+    file = File(
+        sha256=sha,
+        owner_id=owner_id,
+        filename=upload.file.filename or sha,
+        size=size,
+        mime_type=upload.file.content_type or "application/octet-stream",
+        provider_file_id=provider_file_id,
+        blob_path=path,
+    )
+    db.add(file)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # a concurrent upload of the same content by the same user won;
+        # the provider copy made here is not referenced by anything
+        await db.rollback()
+        try:
+            await delete_openai_file(provider_file_id)
+        except Exception:
+            log.warning("could not delete orphaned provider file %s", provider_file_id, exc_info=True)
+        existing = (await db.scalars(select(File).where(File.owner_id == owner_id, File.sha256 == sha))).first()
+        return existing, True
+    return file, False
+
+
+async def resolve_files(db: AsyncSession, owner_id: str, ids: list[str]) -> list[File]:
+    """
+    Maps ChatRequest.file_ids (registry ids or provider file ids) to the
+    caller's registry entries.
+    """
+    if not ids:
+        return []
+    files = (
+        await db.scalars(
+            select(File).where(
+                File.owner_id == owner_id,
+                or_(File.id.in_(ids), File.provider_file_id.in_(ids)),
+            )
+        )
+    ).all()
+    known = {f.id for f in files} | {f.provider_file_id for f in files}
+    missing = [i for i in ids if i not in known]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"File not found: {missing[0]}")
+    return list(files)
@@ -0,0 +1,47 @@
+import importlib.util
+import httpx
+from app.core.config import settings
+
+# One pooled AsyncClient per upstream route, opened/closed by the app lifespan.
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _timeout(route: str) -> httpx.Timeout:
+    if route == "files":
+        return httpx.Timeout(settings.FILES_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+    return httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def _build(route: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    # HTTP/2 needs the optional `h2` package
+    http2 = settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(limits=limits, timeout=_timeout(route), http2=http2)
+
+
+def get_client(route: str = "llm") -> httpx.AsyncClient:
+    """
+    Returns the shared client for a route ("llm" or "files").
+    Created lazily so scripts outside the app lifespan still work.
+    """
+    client = _clients.get(route)
+    if client is None or client.is_closed:
+        client = _build(route)
+        _clients[route] = client
+    return client
+
+
+async def open_clients():
+    for route in ("llm", "files"):
+        get_client(route)
+
+
+async def close_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
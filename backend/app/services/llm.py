@@ -1,17 +1,43 @@
+import json
+from dataclasses import dataclass
 import httpx
 from app.core.config import settings
+from app.services.http_clients import get_client
 
-OPENAI_URL = "https://api.openai.com/v1/responses"
+OPENAI_URL = settings.OPENAI_BASE_URL.rstrip("/") + "/responses"
 
-async def openai_stream_response(messages: list[dict], system_prompt: str, model: str):
-    """
-    Returns an async generator yielding text chunks.
-    """
-    headers = {
-        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+
+class LLMStreamError(RuntimeError):
+    pass
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+    @classmethod
+    def from_response(cls, response: dict) -> "Usage | None":
+        usage = response.get("usage")
+        if not usage:
+            return None
+        details = usage.get("input_tokens_details") or {}
+        return cls(
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0),
+            cached_tokens=details.get("cached_tokens", 0),
+        )
+
+
+def _headers(api_key: str | None = None) -> dict:
+    return {
+        "Authorization": f"Bearer {api_key or settings.OPENAI_API_KEY}",
         "Content-Type": "application/json",
     }
 
+
+def _payload(messages: list[dict], system_prompt: str, model: str, stream: bool = False) -> dict:
     # Responses API uses `input` instead of `messages` in older chat-completions style.
     # We'll pass a formatted "input" list with roles.
     payload = {
@@ -20,55 +46,77 @@ async def openai_stream_response(messages: list[dict], system_prompt: str, model
             {"role": "system", "content": system_prompt},
             *messages
         ],
-        "stream": True,
     }
+    if stream:
+        payload["stream"] = True
+    return payload
 
-    async with httpx.AsyncClient(timeout=None) as client:
-        async with client.stream("POST", OPENAI_URL, json=payload, headers=headers) as r:
-            r.raise_for_status()
-            async for line in r.aiter_lines():
-                if not line:
-                    continue
-                # OpenAI streams "data: {json}"
-                if line.startswith("data: "):
-                    data = line[len("data: "):].strip()
-                    if data == "[DONE]":
-                        return
-                    # minimal parsing: extract incremental output_text if present
-                    # Not all events contain content
-                    if '"output_text"' in data:
-                        # fallback "quick parse" without strict schema
-                        # you can swap to json.loads for production
-                        yield ""  # (we avoid brittle parsing in this MVP)
-import json
 
-async def openai_response(messages: list[dict], system_prompt: str, model: str) -> str:
-    headers = {
-        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+async def openai_stream_response(
+    messages: list[dict], system_prompt: str, model: str, url: str = OPENAI_URL, api_key: str | None = None
+):
+    """
+    Returns an async generator yielding text chunks, followed by a `Usage`
+    when the upstream reports one. `url`/`api_key` point it at any endpoint
+    speaking the Responses API.
+    """
+    payload = _payload(messages, system_prompt, model, stream=True)
 
-    payload = {
-        "model": model,
-        "input": [
-            {"role": "system", "content": system_prompt},
-            *messages
-        ],
-    }
+    # streams can legitimately idle between deltas, so only the read timeout differs
+    timeout = httpx.Timeout(
+        settings.LLM_TIMEOUT_SECONDS,
+        connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+        read=settings.LLM_STREAM_READ_TIMEOUT_SECONDS,
+    )
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post(OPENAI_URL, json=payload, headers=headers)
+    client = get_client("llm")
+    async with client.stream("POST", url, json=payload, headers=_headers(api_key), timeout=timeout) as r:
         r.raise_for_status()
-        data = r.json()
-
-        # Responses typically contain output array; output_text convenience exists in many responses.
-        if "output_text" in data:
-            return data["output_text"]
-
-        # fallback: try to find text in output blocks
-        out = []
-        for item in data.get("output", []):
-            for c in item.get("content", []):
-                if c.get("type") == "output_text":
-                    out.append(c.get("text", ""))
-        return "".join(out).strip()
+        async for line in r.aiter_lines():
+            # OpenAI streams "event: <type>" / "data: {json}" pairs; the
+            # type is repeated inside the json so the event line is skipped.
+            if not line.startswith("data: "):
+                continue
+            data = line[len("data: "):].strip()
+            if data == "[DONE]":
+                return
+
+            event = json.loads(data)
+            etype = event.get("type")
+
+            if etype == "response.output_text.delta":
+                delta = event.get("delta")
+                if delta:
+                    yield delta
+            elif etype == "response.completed":
+                usage = Usage.from_response(event.get("response") or {})
+                if usage is not None:
+                    yield usage
+                return
+            elif etype in ("response.failed", "error"):
+                err = event.get("error") or event.get("response", {}).get("error") or {}
+                raise LLMStreamError(err.get("message", "Upstream stream failed"))
+
+
+async def openai_response(
+    messages: list[dict], system_prompt: str, model: str, url: str = OPENAI_URL, api_key: str | None = None
+) -> tuple[str, Usage | None]:
+    payload = _payload(messages, system_prompt, model)
+
+    client = get_client("llm")
+    r = await client.post(url, json=payload, headers=_headers(api_key))
+    r.raise_for_status()
+    data = r.json()
+
+    # Responses typically contain output array; output_text convenience exists in many responses.
+    usage = Usage.from_response(data)
+    if "output_text" in data:
+        return data["output_text"], usage
+
+    # fallback: try to find text in output blocks
+    out = []
+    for item in data.get("output", []):
+        for c in item.get("content", []):
+            if c.get("type") == "output_text":
+                out.append(c.get("text", ""))
+    return "".join(out).strip(), usage
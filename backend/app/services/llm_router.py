@@ -0,0 +1,441 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+from fastapi import HTTPException
+
+from app.core import metrics
+from app.core.config import settings
+from app.services.admission import admission
+from app.services.llm import LLMStreamError, Usage, openai_response, openai_stream_response
+
+log = logging.getLogger(__name__)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Upstream overload / outage: worth trying another provider.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def error_class(exc: BaseException) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return "http_429" if status == 429 else f"http_{status // 100}xx"
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.TransportError):
+        return "transport"
+    if isinstance(exc, LLMStreamError):
+        return "stream_error"
+    return type(exc).__name__
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    value = exc.response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date form
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def upstream_error(exc: BaseException) -> HTTPException:
+    """
+    Maps a failure before the first delta to the response the client gets:
+    overload/outage is a 503 with Retry-After, anything else a 502.
+    """
+    if is_retryable(exc):
+        retry_after = retry_after_seconds(exc) or 1
+        return HTTPException(
+            status_code=503,
+            detail="The model is temporarily unavailable, please retry",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    return HTTPException(status_code=502, detail="The model request failed")
+
+
+# =========================
+# PROVIDERS
+# =========================
+
+class Provider:
+    """
+    An upstream speaking the OpenAI Responses API (OpenAI itself or a
+    compatible endpoint such as Azure OpenAI, vLLM or a gateway).
+    """
+
+    kind = "openai"
+
+    def __init__(self, name: str, base_url: str | None = None, api_key: str | None = None, models=()):
+        self.name = name
+        self.url = (base_url or settings.OPENAI_BASE_URL).rstrip("/") + "/responses"
+        self.api_key = api_key
+        # models this upstream takes over from other providers on failover;
+        # agents that select it by name can use any model
+        self.models = set(models)
+
+    def serves(self, model: str) -> bool:
+        return model in self.models
+
+    def stream(self, messages: list[dict], system_prompt: str, model: str):
+        return openai_stream_response(messages, system_prompt, model, url=self.url, api_key=self.api_key)
+
+    async def respond(self, messages: list[dict], system_prompt: str, model: str) -> tuple[str, Usage | None]:
+        return await openai_response(messages, system_prompt, model, url=self.url, api_key=self.api_key)
+
+
+class MockProvider(Provider):
+    """
+    Local provider for tests and demos: echoes the last user message word by
+    word. Only registered with LLM_MOCK_PROVIDER_ENABLED, and only used by
+    agents that select it explicitly.
+    """
+
+    kind = "mock"
+
+    def __init__(self, name: str = "mock"):
+        super().__init__(name, base_url="mock://")
+
+    def _reply(self, messages: list[dict]) -> str:
+        last = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        return f"Mock reply to: {last}"
+
+    def _usage(self, messages: list[dict], system_prompt: str, reply: str) -> Usage:
+        prompt = system_prompt + "".join(m["content"] for m in messages)
+        return Usage(prompt_tokens=len(prompt) // 4, completion_tokens=len(reply) // 4)
+
+    async def stream(self, messages: list[dict], system_prompt: str, model: str):
+        reply = self._reply(messages)
+        for i, word in enumerate(reply.split(" ")):
+            await asyncio.sleep(0)
+            yield word if i == 0 else " " + word
+        yield self._usage(messages, system_prompt, reply)
+
+    async def respond(self, messages: list[dict], system_prompt: str, model: str) -> tuple[str, Usage | None]:
+        reply = self._reply(messages)
+        return reply, self._usage(messages, system_prompt, reply)
+
+
+# =========================
+# LATENCY / HEALTH
+# =========================
+
+class _Stats:
+    """
+    Time-to-first-token samples and failure state of one provider/model pair.
+    """
+
+    def __init__(self):
+        self.ttft_ms: deque[float] = deque(maxlen=200)
+        self.ewma_ms: float | None = None
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    def observe(self, ms: float):
+        self.ttft_ms.append(ms)
+        self.ewma_ms = ms if self.ewma_ms is None else 0.8 * self.ewma_ms + 0.2 * ms
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    def fail(self, retry_after: float | None = None):
+        self.failures += 1
+        cooldown = max(retry_after or 0.0, settings.LLM_PROVIDER_COOLDOWN_SECONDS)
+        self.cooldown_until = time.monotonic() + cooldown
+
+    def p95(self) -> float | None:
+        if len(self.ttft_ms) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.ttft_ms)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class _Attempt:
+    def __init__(self, provider: Provider, gen):
+        self.provider = provider
+        self.gen = gen
+        self.started = time.perf_counter()
+
+    async def first(self) -> str | None:
+        try:
+            return await self.gen.__anext__()
+        except StopAsyncIteration:
+            return None
+
+
+class _Relay:
+    """
+    Deltas of the winning attempt. aclose() always closes the upstream
+    stream, even when the relay was never iterated, which an async
+    generator's finally would not do.
+    """
+
+    def __init__(self, winner: _Attempt, first: str | None, model: str):
+        self.winner = winner
+        self._deltas = self._iterate(first, model)
+
+    async def _iterate(self, first: str | None, model: str):
+        labels = {"provider": self.winner.provider.name, "model": model}
+        try:
+            if first is None:
+                return
+            yield first
+            async for delta in self.winner.gen:
+                yield delta
+        except Exception as exc:
+            metrics.LLM_ERRORS.inc(error=error_class(exc), **labels)
+            raise
+        finally:
+            metrics.LLM_TOTAL_SECONDS.observe(time.perf_counter() - self.winner.started, **labels)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._deltas.__anext__()
+
+    async def aclose(self):
+        try:
+            await self._deltas.aclose()
+        finally:
+            await self.winner.gen.aclose()
+
+
+# =========================
+# ROUTER
+# =========================
+
+class LLMRouter:
+    def __init__(self):
+        self.providers: dict[str, Provider] = {}
+        self._stats: dict[tuple[str, str], _Stats] = {}
+
+    def register(self, provider: Provider):
+        self.providers[provider.name] = provider
+
+    def _stat(self, provider: Provider, model: str) -> _Stats:
+        return self._stats.setdefault((provider.name, model), _Stats())
+
+    def candidates(self, provider_name: str, model: str) -> list[Provider]:
+        """
+        The agent's own provider, then the providers that list `model` for
+        failover, fastest first. Providers cooling down after a failure go
+        last. Nothing is tried when the agent's provider is not configured.
+        """
+        preferred = self.providers.get(provider_name)
+        if preferred is None:
+            return []
+        if preferred.kind == "mock":
+            return [preferred]
+
+        now = time.monotonic()
+
+        def cooling(p: Provider) -> bool:
+            st = self._stats.get((p.name, model))
+            return st is not None and st.cooldown_until > now
+
+        def latency(p: Provider) -> float:
+            st = self._stats.get((p.name, model))
+            return st.ewma_ms if st is not None and st.ewma_ms is not None else settings.LLM_HEDGE_DEFAULT_DELAY_MS
+
+        fallbacks = sorted(
+            (p for p in self.providers.values() if p is not preferred and p.kind != "mock" and p.serves(model)),
+            key=latency,
+        )
+        # stable: the agent's provider stays first unless it is cooling down
+        return sorted([preferred] + fallbacks, key=cooling)
+
+    def _plan(self, provider_name: str, model: str) -> deque[Provider]:
+        # with a single upstream, failover/hedging retries that same upstream
+        candidates = self.candidates(provider_name, model)
+        if not candidates:
+            raise LLMStreamError(f"No provider configured for model {model}")
+        attempts = max(1, settings.LLM_FAILOVER_ATTEMPTS)
+        if candidates[0].kind == "mock":
+            attempts = 1
+        return deque((candidates * attempts)[:attempts])
+
+    def hedge_delay(self, provider: Provider, model: str) -> float:
+        p95 = self._stat(provider, model).p95()
+        if p95 is None:
+            p95 = settings.LLM_HEDGE_DEFAULT_DELAY_MS
+        return max(p95, settings.LLM_HEDGE_MIN_DELAY_MS) / 1000
+
+    def _failed(self, provider: Provider, model: str, exc: BaseException, retries: int) -> float:
+        """
+        Records a retryable failure and returns how long to back off before
+        asking the same upstream again: its Retry-After when given, else
+        exponential, with jitter so queued requests don't retry in lockstep.
+        """
+        log.warning("LLM provider %s failed for %s: %r", provider.name, model, exc)
+        metrics.LLM_ERRORS.inc(provider=provider.name, model=model, error=error_class(exc))
+        retry_after = retry_after_seconds(exc)
+        self._stat(provider, model).fail(retry_after)
+        if retry_after is not None:
+            admission.pause(provider.name, model, retry_after)
+        base = retry_after if retry_after is not None else 0.25 * 2 ** retries
+        return min(base * random.uniform(0.5, 1.5), settings.LLM_RETRY_MAX_WAIT_SECONDS)
+
+    async def _race(self, plan: deque[Provider], messages, system_prompt, model, prompt_tokens: int):
+        """
+        Runs attempts until one produces its first delta. A hedge is fired once
+        the first attempt exceeds its p95 TTFT (only if the limiter of the
+        provider it goes to has a spare slot); retryable failures fail over to
+        the next provider in the plan.
+        """
+        running: dict[asyncio.Task, _Attempt] = {}
+        hedge_permit = None
+        last_exc: BaseException | None = None
+        last_provider: Provider | None = None
+        backoff = 0.0
+        retries = 0
+
+        def launch():
+            provider = plan.popleft()
+            attempt = _Attempt(provider, provider.stream(messages, system_prompt, model))
+            running[asyncio.create_task(attempt.first())] = attempt
+
+        launch()
+        try:
+            while True:
+                if not running:
+                    raise last_exc
+                timeout = None
+                if settings.LLM_HEDGE_ENABLED and plan and hedge_permit is None and len(running) == 1:
+                    attempt = next(iter(running.values()))
+                    elapsed = time.perf_counter() - attempt.started
+                    timeout = max(0.0, self.hedge_delay(attempt.provider, model) - elapsed)
+
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # charged to the provider the hedge actually goes to
+                    hedge_permit = admission.try_acquire(plan[0].name, model, prompt_tokens)
+                    if hedge_permit is None:
+                        # no headroom: hedging would only add load, just keep waiting
+                        hedge_permit = False
+                    else:
+                        launch()
+                    continue
+
+                for task in done:
+                    attempt = running.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        ttft = time.perf_counter() - attempt.started
+                        self._stat(attempt.provider, model).observe(ttft * 1000)
+                        metrics.LLM_TTFT_SECONDS.observe(ttft, provider=attempt.provider.name, model=model)
+                        return attempt, task.result()
+                    if not is_retryable(exc):
+                        metrics.LLM_ERRORS.inc(provider=attempt.provider.name, model=model, error=error_class(exc))
+                        raise exc
+                    backoff = self._failed(attempt.provider, model, exc, retries)
+                    retries += 1
+                    last_exc, last_provider = exc, attempt.provider
+
+                if not running and plan:
+                    if plan[0] is last_provider:
+                        await asyncio.sleep(backoff)
+                    launch()
+        finally:
+            if hedge_permit:
+                hedge_permit.release()
+            # losers (and the hedge twin of the winner) are abandoned
+            for task in running:
+                task.cancel()
+            for task, attempt in running.items():
+                try:
+                    await task
+                except BaseException:
+                    pass
+                await attempt.gen.aclose()
+
+    async def start(
+        self, messages: list[dict], system_prompt: str, model: str, provider_name: str = "openai",
+        prompt_tokens: int = 0,
+    ) -> "_Relay":
+        """
+        Waits for the first delta and returns an async iterator over all
+        deltas (text chunks, then a `Usage` when reported). Failover and
+        hedging only happen up to that point, so the caller can still turn
+        an upstream failure into a proper HTTP error. The caller must
+        aclose() the result, iterated or not.
+        """
+        plan = self._plan(provider_name, model)
+        winner, first = await self._race(plan, messages, system_prompt, model, prompt_tokens)
+        return _Relay(winner, first, model)
+
+    async def stream(self, messages: list[dict], system_prompt: str, model: str, provider_name: str = "openai"):
+        relay = await self.start(messages, system_prompt, model, provider_name)
+        try:
+            async for delta in relay:
+                yield delta
+        finally:
+            await relay.aclose()
+
+    async def respond(
+        self, messages: list[dict], system_prompt: str, model: str, provider_name: str = "openai"
+    ) -> tuple[str, Usage | None]:
+        last_exc = None
+        plan = self._plan(provider_name, model)
+        for retries, provider in enumerate(plan):
+            started = time.perf_counter()
+            try:
+                result = await provider.respond(messages, system_prompt, model)
+            except Exception as exc:
+                if not is_retryable(exc):
+                    metrics.LLM_ERRORS.inc(provider=provider.name, model=model, error=error_class(exc))
+                    raise
+                backoff = self._failed(provider, model, exc, retries)
+                last_exc = exc
+                if retries + 1 < len(plan) and plan[retries + 1] is provider:
+                    await asyncio.sleep(backoff)
+                continue
+            metrics.LLM_TOTAL_SECONDS.observe(time.perf_counter() - started, provider=provider.name, model=model)
+            return result
+        raise last_exc
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            f"{name}:{model}": {
+                "samples": len(st.ttft_ms),
+                "ewma_ttft_ms": round(st.ewma_ms, 1) if st.ewma_ms is not None else None,
+                "p95_ttft_ms": st.p95(),
+                "failures": st.failures,
+                "cooling_down": st.cooldown_until > now,
+            }
+            for (name, model), st in self._stats.items()
+        }
+
+
+def build_router() -> LLMRouter:
+    router = LLMRouter()
+    router.register(Provider("openai"))
+    if settings.LLM_MOCK_PROVIDER_ENABLED:
+        router.register(MockProvider("mock"))
+    for name, cfg in settings.LLM_PROVIDERS.items():
+        router.register(
+            Provider(name, base_url=cfg["base_url"], api_key=cfg.get("api_key"), models=cfg.get("models", ()))
+        )
+    return router
+
+
+llm_router = build_router()
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.email import SMTPSender
+from app.db.session import AsyncSessionLocal
+from app.models.outbound_email import OutboundEmail
+
+log = logging.getLogger(__name__)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease_until(now: datetime) -> datetime:
+    return now + timedelta(seconds=max(settings.MAIL_QUEUE_LEASE_SECONDS, 2 * settings.MAIL_SMTP_TIMEOUT_SECONDS))
+
+
+def enqueue_email(db: AsyncSession, *, subject: str, recipients: list[str], body: str, subtype: str = "plain"):
+    """
+    Adds an email to the outbound queue as part of the caller's transaction;
+    it is sent by the worker after the caller commits.
+    """
+    db.add(OutboundEmail(
+        recipients=",".join(recipients),
+        subject=subject,
+        body=body,
+        subtype=subtype,
+        status="pending",
+        attempts=0,
+        next_attempt_at=_now(),
+    ))
+
+
+class MailQueueWorker:
+    """
+    Drains outbound_emails: claims a batch (SKIP LOCKED on Postgres, with a
+    lease so a crashed worker's rows are picked up again), sends them over
+    one reused SMTP connection and retries failures with exponential backoff.
+    """
+
+    def __init__(self):
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._sender = SMTPSender()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._sender.close()
+
+    def wake(self):
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                sent = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("mail queue iteration failed")
+                sent = 0
+            if sent:
+                continue
+            # idle: drop the SMTP connection and wait for new mail or the next poll
+            await self._sender.close()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.MAIL_QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> list[OutboundEmail]:
+        async with AsyncSessionLocal() as db:
+            now = _now()
+            rows = (
+                await db.scalars(
+                    select(OutboundEmail)
+                    .where(OutboundEmail.status == "pending", OutboundEmail.next_attempt_at <= now)
+                    .order_by(OutboundEmail.next_attempt_at)
+                    .limit(settings.MAIL_QUEUE_BATCH_SIZE)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            for row in rows:
+                row.next_attempt_at = _lease_until(now)
+            await db.commit()
+            return list(rows)
+
+    async def _renew(self, mail_ids: list[int]) -> datetime:
+        # keeps the whole batch leased, sent rows included: their outcome is
+        # only written at the end, and an expired lease would let another
+        # worker claim and send them again
+        until = _lease_until(_now())
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(OutboundEmail).where(OutboundEmail.id.in_(mail_ids)).values(next_attempt_at=until)
+            )
+            await db.commit()
+        return until
+
+    async def drain_once(self) -> int:
+        """
+        Sends one claimed batch; returns how many emails were attempted.
+        """
+        batch = await self._claim()
+        lease = batch[0].next_attempt_at if batch else None
+        send_timeout = timedelta(seconds=settings.MAIL_SMTP_TIMEOUT_SECONDS)
+        results = []
+        for mail in batch:
+            # a send is capped at MAIL_SMTP_TIMEOUT_SECONDS, so renewing
+            # before each one that might outlast the lease means no row is
+            # ever claimable by another worker while this one holds it
+            if lease - _now() < send_timeout:
+                lease = await self._renew([m.id for m in batch])
+            values = {"attempts": mail.attempts + 1}
+            try:
+                await asyncio.wait_for(
+                    self._sender.send(
+                        subject=mail.subject,
+                        recipients=mail.recipients.split(","),
+                        body=mail.body,
+                        subtype=mail.subtype,
+                    ),
+                    settings.MAIL_SMTP_TIMEOUT_SECONDS,
+                )
+                values.update(status="sent", sent_at=_now(), last_error=None)
+            except Exception as e:
+                log.warning("sending email %s failed (attempt %d)", mail.id, values["attempts"], exc_info=True)
+                await self._sender.close()
+                values["last_error"] = str(e)[:500]
+                if values["attempts"] >= settings.MAIL_MAX_ATTEMPTS:
+                    values["status"] = "failed"
+                else:
+                    backoff = min(2 ** values["attempts"], 3600) * (0.5 + random.random())
+                    values["next_attempt_at"] = _now() + timedelta(seconds=backoff)
+            results.append((mail.id, values))
+
+        # one transaction for the whole batch's outcomes
+        if results:
+            async with AsyncSessionLocal() as db:
+                for mail_id, values in results:
+                    await db.execute(update(OutboundEmail).where(OutboundEmail.id == mail_id).values(**values))
+                await db.commit()
+        return len(batch)
+
+
+mail_worker = MailQueueWorker()
@@ -1,19 +1,17 @@
-import os
-import httpx
-from fastapi import UploadFile
+from typing import BinaryIO
+from app.core.config import settings
+from app.services.http_clients import get_client
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-async def upload_file_to_openai(file: UploadFile):
+async def upload_file_to_openai(filename: str, fileobj: BinaryIO, content_type: str | None = None):
     """
     Uploads the file to OpenAI Files API.
     Returns JSON including OpenAI file id.
     """
-    if not OPENAI_API_KEY:
+    if not settings.OPENAI_API_KEY:
         raise RuntimeError("OPENAI_API_KEY is not set")
 
-    url = "https://api.openai.com/v1/files"
-    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
+    url = settings.OPENAI_BASE_URL.rstrip("/") + "/files"
+    headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
 
     # OpenAI expects multipart form:
     # file=<binary> purpose=<string>
@@ -21,13 +19,28 @@ async def upload_file_to_openai(file: UploadFile):
         "purpose": (None, "assistants"),
     }
 
-    contents = await file.read()
-
+    # hand httpx the file object so it streams it in chunks
+    # instead of holding the whole upload in memory
     files = {
-        "file": (file.filename, contents, file.content_type or "application/octet-stream")
+        "file": (filename, fileobj, content_type or "application/octet-stream")
     }
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post(url, headers=headers, data=form_data, files=files)
-        r.raise_for_status()
-        return r.json()
+    client = get_client("files")
+    r = await client.post(url, headers=headers, data=form_data, files=files)
+    r.raise_for_status()
+    return r.json()
+
+
+async def delete_openai_file(file_id: str):
+    """
+    Deletes a file from the OpenAI Files API.
+    """
+    if not settings.OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY is not set")
+
+    url = settings.OPENAI_BASE_URL.rstrip("/") + f"/files/{file_id}"
+    headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
+
+    client = get_client("files")
+    r = await client.delete(url, headers=headers)
+    r.raise_for_status()
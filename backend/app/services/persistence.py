@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import sys
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.llm import Usage
+from app.services.usage import Rollup, upsert_statement
+
+log = logging.getLogger(__name__)
+
+USAGE_COLUMNS = ("model", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms", "ttft_ms")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(eq=False)
+class Turn:
+    """
+    Everything a chat turn writes. Timestamps are taken in Python so the
+    user and assistant rows keep their order inside a single transaction.
+    """
+    conversation_id: str
+    user_id: str
+    agent_id: str
+    user_content: str
+    new_conversation: bool = False
+    user_at: datetime = field(default_factory=utcnow)
+    assistant_content: str | None = None
+    assistant_at: datetime | None = None
+    # what the assistant reply cost (usage is None for cached/replayed answers)
+    project_id: str | None = None
+    model: str | None = None
+    usage: Usage | None = None
+    latency_ms: int | None = None
+    ttft_ms: int | None = None
+
+    def conversation_row(self) -> dict:
+        return {
+            "id": self.conversation_id,
+            "agent_id": self.agent_id,
+            "user_id": self.user_id,
+            "title": "New Chat",
+            "created_at": self.user_at,
+        }
+
+    def message_rows(self) -> list[dict]:
+        rows = [{
+            "id": str(uuid.uuid4()),
+            "conversation_id": self.conversation_id,
+            "user_id": self.user_id,
+            "role": "user",
+            "content": self.user_content,
+            "created_at": self.user_at,
+            **dict.fromkeys(USAGE_COLUMNS),
+        }]
+        if self.assistant_content is not None:
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "conversation_id": self.conversation_id,
+                "user_id": self.user_id,
+                "role": "assistant",
+                "content": self.assistant_content,
+                "created_at": self.assistant_at or utcnow(),
+                "model": self.model,
+                "prompt_tokens": self.usage.prompt_tokens if self.usage else None,
+                "completion_tokens": self.usage.completion_tokens if self.usage else None,
+                "cached_tokens": self.usage.cached_tokens if self.usage else None,
+                "latency_ms": self.latency_ms,
+                "ttft_ms": self.ttft_ms,
+            })
+        return rows
+
+    def add_usage(self, rollup: Rollup):
+        if self.assistant_content is None or self.project_id is None:
+            return
+        usage = self.usage or Usage()
+        rollup.add(
+            self.assistant_at or self.user_at, self.user_id, self.project_id, self.agent_id, self.model or "",
+            requests=1,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_tokens=usage.cached_tokens,
+            latency_ms=self.latency_ms,
+        )
+
+
+async def _write(turns: list[Turn]):
+    conversations = [t.conversation_row() for t in turns if t.new_conversation]
+    messages = [row for t in turns for row in t.message_rows()]
+    rollup = Rollup()
+    for t in turns:
+        t.add_usage(rollup)
+    async with AsyncSessionLocal() as db:
+        if conversations:
+            await db.execute(insert(Conversation), conversations)
+        await db.execute(insert(Message), messages)
+        # hourly usage rollups move with the messages they count
+        if rollup:
+            await db.execute(upsert_statement(db.bind.dialect.name), rollup.values())
+        await db.commit()
+
+
+class MessageWriter:
+    """
+    Write-behind persistence: turns are queued and flushed by a background
+    task in batched multi-row inserts, one transaction per batch. stop()
+    drains the queue, so nothing acknowledged is lost on a clean shutdown.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_retries: int = 5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: asyncio.Queue[Turn] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        # unflushed turns, so follow-up requests can see them
+        self._pending: dict[str, list[Turn]] = {}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def submit(self, turn: Turn):
+        if self._task is None:
+            raise RuntimeError("MessageWriter is not running")
+        self._pending.setdefault(turn.conversation_id, []).append(turn)
+        self._queue.put_nowait(turn)
+
+    def pending_conversation(self, conversation_id: str) -> Turn | None:
+        for turn in self._pending.get(conversation_id, []):
+            if turn.new_conversation:
+                return turn
+        return None
+
+    def pending_messages(self, conversation_id: str) -> list[dict]:
+        msgs = []
+        for turn in self._pending.get(conversation_id, []):
+            msgs += [{"role": r["role"], "content": r["content"]} for r in turn.message_rows()]
+        return msgs
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            turn = await self._queue.get()
+            if turn is None:
+                break
+            batch = [turn]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            await self._flush(batch)
+
+        # drain anything queued behind the stop marker
+        rest = []
+        while not self._queue.empty():
+            turn = self._queue.get_nowait()
+            if turn is not None:
+                rest.append(turn)
+        for i in range(0, len(rest), self.batch_size):
+            await self._flush(rest[i:i + self.batch_size])
+
+    async def _flush(self, batch: list[Turn]):
+        try:
+            await _write(batch)
+        except Exception:
+            log.warning("chat turn batch of %d failed, writing turns one by one", len(batch), exc_info=True)
+            await self._write_each(batch)
+
+        for turn in batch:
+            pending = self._pending.get(turn.conversation_id)
+            if pending and turn in pending:
+                pending.remove(turn)
+                if not pending:
+                    del self._pending[turn.conversation_id]
+
+    async def _write_each(self, turns: list[Turn]):
+        """
+        One transaction per turn, so a row that can never be written (say,
+        its conversation was purged meanwhile) only costs its own turn.
+        Turns that keep failing are retried with backoff, then dropped.
+        """
+        delay = 0.1
+        for attempt in range(self.max_retries):
+            failed = []
+            for turn in turns:
+                try:
+                    await _write([turn])
+                except Exception:
+                    failed.append(turn)
+                    error = sys.exc_info()
+            if not failed:
+                return
+            turns = failed
+            if attempt < self.max_retries - 1:
+                log.warning("%d chat turns failed to write, retrying in %.1fs", len(turns), delay, exc_info=error)
+                await asyncio.sleep(delay)
+                delay *= 2
+        log.error("dropping %d chat turns after %d failed writes", len(turns), self.max_retries, exc_info=error)
+
+
+message_writer = MessageWriter(settings.PERSIST_BATCH_SIZE, settings.PERSIST_FLUSH_INTERVAL_MS / 1000)
+
+
+async def persist_turn(turn: Turn):
+    """
+    Records a whole turn (conversation, user and assistant messages) in one
+    transaction, or hands it to the write-behind queue when enabled.
+    """
+    if settings.PERSIST_WRITE_BEHIND:
+        message_writer.submit(turn)
+    else:
+        await _write([turn])
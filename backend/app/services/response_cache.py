@@ -0,0 +1,156 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from app.core.config import settings
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def prompt_hash(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode()).hexdigest()
+
+
+def cache_key(agent_id: str, model: str, system_prompt: str, messages: list[dict]) -> str:
+    history = [(m["role"], _normalize(m["content"])) for m in messages]
+    raw = json.dumps([agent_id, model, prompt_hash(system_prompt), history], separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def semantic_bucket(agent_id: str, model: str, system_prompt: str) -> str:
+    return f"{agent_id}:{model}:{prompt_hash(system_prompt)}"
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def question_terms(question: str) -> str:
+    """
+    Casing, punctuation and spacing removed; the words and their order are
+    kept. Similarity scores can't tell "the pro plan" from "the basic
+    plan", so two questions only match when these terms are identical.
+    """
+    return " ".join(_WORD_RE.findall(question.lower()))
+
+
+def near_key(agent_id: str, model: str, system_prompt: str, question: str) -> str:
+    terms = hashlib.sha256(question_terms(question).encode()).hexdigest()
+    return f"{semantic_bucket(agent_id, model, system_prompt)}:{terms}"
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of full assistant answers keyed on
+    (agent, model, system prompt hash, normalised history), with an optional
+    lookup of first-turn questions that differ only in casing, punctuation
+    or spacing. Entries and counters are per agent, so answers never cross
+    from one owner's agent to another's.
+    """
+
+    _EMPTY = {"hits": 0, "semantic_hits": 0, "misses": 0, "size": 0}
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[float, str, str]] = OrderedDict()
+        # near key -> exact key; stale targets are dropped on lookup or prune
+        self._near: dict[str, str] = {}
+        self._evicted = 0
+        self._lock = threading.Lock()
+        self.stats: dict[str, dict[str, int]] = {}
+
+    def _count(self, agent_id: str, field: str, n: int = 1):
+        self.stats.setdefault(agent_id, dict(self._EMPTY))[field] += n
+
+    def _pop(self, key: str):
+        _, _, agent_id = self._items.pop(key)
+        self._count(agent_id, "size", -1)
+
+    def _get(self, key: str) -> str | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        stored_at, answer, _ = item
+        if time.monotonic() - stored_at > self.ttl:
+            self._pop(key)
+            return None
+        self._items.move_to_end(key)
+        return answer
+
+    def lookup(
+        self, agent_id: str, model: str, system_prompt: str, messages: list[dict], semantic: bool = False
+    ) -> str | None:
+        with self._lock:
+            answer = self._get(cache_key(agent_id, model, system_prompt, messages))
+            if answer is not None:
+                self._count(agent_id, "hits")
+                return answer
+
+            if semantic and _is_first_turn(messages):
+                key = self._near.get(near_key(agent_id, model, system_prompt, messages[0]["content"]))
+                answer = self._get(key) if key else None
+                if answer is not None:
+                    self._count(agent_id, "semantic_hits")
+                    return answer
+
+            self._count(agent_id, "misses")
+            return None
+
+    def store(
+        self, agent_id: str, model: str, system_prompt: str, messages: list[dict], answer: str, semantic: bool = False
+    ):
+        key = cache_key(agent_id, model, system_prompt, messages)
+        with self._lock:
+            is_new = key not in self._items
+            self._items[key] = (time.monotonic(), answer, agent_id)
+            self._items.move_to_end(key)
+            if is_new:
+                self._count(agent_id, "size")
+            while len(self._items) > self.maxsize:
+                self._pop(next(iter(self._items)))
+                self._evicted += 1
+
+            if semantic and _is_first_turn(messages):
+                self._near[near_key(agent_id, model, system_prompt, messages[0]["content"])] = key
+
+            # keep the near-key map from outgrowing the cache it points into
+            if self._evicted >= max(1, self.maxsize // 2):
+                self._near = {n: k for n, k in self._near.items() if k in self._items}
+                self._evicted = 0
+
+    def snapshot(self, agent_id: str) -> dict:
+        with self._lock:
+            stats = self.stats.get(agent_id, self._EMPTY)
+            hits = stats["hits"] + stats["semantic_hits"]
+            total = hits + stats["misses"]
+            return {**stats, "hit_rate": round(hits / total, 4) if total else 0.0}
+
+    def forget(self, agent_id: str):
+        """
+        Drops a deleted agent's answers, near keys and counters.
+        """
+        with self._lock:
+            for key in [k for k, item in self._items.items() if item[2] == agent_id]:
+                del self._items[key]
+            self._near = {n: k for n, k in self._near.items() if not n.startswith(f"{agent_id}:")}
+            self.stats.pop(agent_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._near.clear()
+            self.stats.clear()
+
+
+def _is_first_turn(messages: list[dict]) -> bool:
+    return len(messages) == 1 and messages[0]["role"] == "user"
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_SIZE,
+    settings.RESPONSE_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,372 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.file import File
+from app.services.embeddings import get_embedder
+
+log = logging.getLogger(__name__)
+
+TEXT_MIME_PREFIXES = ("text/",)
+TEXT_MIME_TYPES = {"application/json", "application/xml", "application/x-yaml", "application/markdown"}
+
+
+# =========================
+# EXTRACTION + CHUNKING
+# =========================
+
+def extract_text(path: str, mime_type: str) -> str:
+    if mime_type == "application/pdf" or path.lower().endswith(".pdf"):
+        try:
+            import pypdf
+        except ImportError:
+            log.warning("pypdf not installed; skipping PDF %s", path)
+            return ""
+        reader = pypdf.PdfReader(path)
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+    if mime_type.startswith(TEXT_MIME_PREFIXES) or mime_type in TEXT_MIME_TYPES:
+        with open(path, "rb") as fh:
+            return fh.read().decode("utf-8", errors="replace")
+
+    # unknown binary: try utf-8 and give up on anything that clearly isn't text
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    if b"\x00" in raw[:4096]:
+        return ""
+    return raw.decode("utf-8", errors="replace")
+
+
+def chunk_text(text: str, size: int, overlap: int) -> list[str]:
+    """
+    Splits text into ~`size`-char chunks, preferring paragraph and sentence
+    boundaries, with `overlap` chars carried into the next chunk.
+    """
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            window = text[start:end]
+            cut = max(window.rfind("\n\n"), window.rfind(". "), window.rfind("\n"))
+            if cut > size // 2:
+                end = start + cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+# =========================
+# PER-AGENT INDEX
+# =========================
+
+def top_k(queries: np.ndarray, vectors: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+    """
+    Batched top-k cosine search; `queries` is (m, dim), normalised.
+    """
+    n = len(vectors)
+    if n == 0:
+        return [[] for _ in range(len(queries))]
+    k = min(k, n)
+    scores = queries @ np.asarray(vectors).T  # (m, n)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    results = []
+    for row, idx in enumerate(top):
+        idx = idx[np.argsort(-scores[row, idx])]
+        results.append([(int(i), float(scores[row, i])) for i in idx])
+    return results
+
+
+@dataclass
+class Passage:
+    file_id: str
+    text: str
+    score: float
+
+
+class AgentIndex:
+    """
+    Normalised chunk vectors of one agent as a NumPy matrix (optionally
+    memory-mapped from disk) plus chunk texts. Search is a single
+    matrix-vector product and an argpartition.
+
+    On disk every save is a new generation directory (gen-00000001, ...),
+    written under a private temp name and renamed into place. The rename
+    fails if another writer (thread or process) already took that
+    generation, so concurrent writers never overwrite each other: the
+    loser reloads the newer generation and applies its change again.
+    """
+
+    KEEP_GENERATIONS = 2
+
+    def __init__(self, directory: str, embedder_name: str, dim: int):
+        self.directory = directory
+        self.embedder_name = embedder_name
+        self.dim = dim
+        self.generation = 0
+        self._seen_mtime = None
+        self._reset()
+
+    def _reset(self):
+        self.vectors = np.empty((0, self.dim), dtype=np.float32)
+        self.texts: list[str] = []
+        self.file_ids: list[str] = []
+        self.meta = {"embedder": self.embedder_name, "dim": self.dim, "files": []}
+
+    def _gen_dir(self, generation: int) -> str:
+        return os.path.join(self.directory, f"gen-{generation:08d}")
+
+    def _generations(self) -> list[int]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(n[4:]) for n in names if n.startswith("gen-") and n[4:].isdigit())
+
+    @staticmethod
+    def _paths(d: str):
+        return os.path.join(d, "vectors.npy"), os.path.join(d, "chunks.jsonl"), os.path.join(d, "meta.json")
+
+    def _mtime(self) -> int | None:
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def stale(self) -> bool:
+        """
+        True when another writer published a newer generation. A stat of
+        the directory per call; it is only listed when its mtime moved.
+        """
+        mtime = self._mtime()
+        if mtime == self._seen_mtime:
+            return False
+        self._seen_mtime = mtime
+        generations = self._generations()
+        return bool(generations) and generations[-1] > self.generation
+
+    def load(self) -> "AgentIndex":
+        # stat before listing, so a generation renamed in meanwhile shows up as stale
+        self._seen_mtime = self._mtime()
+        generations = self._generations()
+        if not generations:
+            return self
+        self.generation = generations[-1]
+        vec_path, chunk_path, meta_path = self._paths(self._gen_dir(self.generation))
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        if meta.get("embedder") != self.embedder_name or meta.get("dim") != self.dim:
+            # vectors from another embedder are not comparable with today's
+            # queries; start over, files get re-embedded when attached again
+            log.warning(
+                "index %s was built with %s/%s, not %s/%s; ignoring it",
+                self.directory, meta.get("embedder"), meta.get("dim"), self.embedder_name, self.dim,
+            )
+            return self
+        self.meta = meta
+        self.vectors = np.load(vec_path, mmap_mode="r" if settings.RETRIEVAL_MMAP else None)
+        with open(chunk_path) as fh:
+            for line in fh:
+                row = json.loads(line)
+                self.file_ids.append(row["file_id"])
+                self.texts.append(row["text"])
+        return self
+
+    def add(self, file_id: str, chunks: list[str], vectors: np.ndarray):
+        while True:
+            if file_id in self.meta["files"]:
+                return
+            self.vectors = np.vstack([np.asarray(self.vectors), vectors.astype(np.float32)])
+            self.texts += chunks
+            self.file_ids += [file_id] * len(chunks)
+            self.meta["files"].append(file_id)
+            if self._commit():
+                return
+            # another writer got there first: start from its generation
+            self._reset()
+            self.load()
+
+    def _commit(self) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        vec_path, chunk_path, meta_path = self._paths(tmp)
+        with open(vec_path, "wb") as fh:
+            np.save(fh, self.vectors)
+        with open(chunk_path, "w") as fh:
+            for fid, text in zip(self.file_ids, self.texts):
+                fh.write(json.dumps({"file_id": fid, "text": text}) + "\n")
+        with open(meta_path, "w") as fh:
+            json.dump(self.meta, fh)
+        try:
+            os.rename(tmp, self._gen_dir(self.generation + 1))
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        self.generation += 1
+
+        # readers holding an older generation keep their open files
+        for old in self._generations()[:-self.KEEP_GENERATIONS]:
+            shutil.rmtree(self._gen_dir(old), ignore_errors=True)
+        return True
+
+    def search(self, queries: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        return top_k(queries, self.vectors, k)
+
+
+class RetrievalEngine:
+    def __init__(self):
+        self.embedder = get_embedder()
+        self._indexes: OrderedDict[str, AgentIndex] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def _dir(self, agent_id: str) -> str:
+        return os.path.join(settings.RETRIEVAL_DIR, agent_id)
+
+    async def _index(self, agent_id: str) -> AgentIndex:
+        index = self._indexes.get(agent_id)
+        # another worker may have saved a newer generation since this one loaded
+        if index is None or index.stale():
+            index = AgentIndex(self._dir(agent_id), self.embedder.name, self.embedder.dim)
+            index = await run_in_threadpool(index.load)
+            self._indexes[agent_id] = index
+            while len(self._indexes) > settings.RETRIEVAL_CACHED_INDEXES:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(agent_id)
+        return index
+
+    def _prepared_path(self, f: File) -> str:
+        name = f"{f.sha256}-{self.embedder.name}-{settings.RETRIEVAL_CHUNK_CHARS}-{settings.RETRIEVAL_CHUNK_OVERLAP}.npz"
+        return os.path.join(settings.RETRIEVAL_DIR, ".files", f.sha256[:2], name)
+
+    def _load_prepared(self, f: File) -> tuple[list[str], np.ndarray] | None:
+        try:
+            with np.load(self._prepared_path(f), allow_pickle=False) as data:
+                return data["chunks"].tolist(), data["vectors"]
+        except FileNotFoundError:
+            return None
+
+    def _save_prepared(self, f: File, chunks: list[str], vectors: np.ndarray):
+        path = self._prepared_path(f)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".npz")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, chunks=np.array(chunks, dtype=str), vectors=vectors.astype(np.float32))
+        os.replace(tmp, path)
+
+    async def prepare(self, f: File) -> tuple[list[str], np.ndarray]:
+        """
+        Extracts, chunks and embeds a file once per content hash and
+        embedder; uploads call this, so chat turns only search.
+        """
+        prepared = await run_in_threadpool(self._load_prepared, f)
+        if prepared is not None:
+            return prepared
+        text = await run_in_threadpool(extract_text, f.blob_path, f.mime_type)
+        chunks = chunk_text(text, settings.RETRIEVAL_CHUNK_CHARS, settings.RETRIEVAL_CHUNK_OVERLAP)
+        vectors = (
+            await self.embedder.aembed(chunks)
+            if chunks else np.empty((0, self.embedder.dim), dtype=np.float32)
+        )
+        await run_in_threadpool(self._save_prepared, f, chunks, vectors)
+        return chunks, vectors
+
+    async def attach_files(self, agent_id: str, files: list[File]):
+        """
+        Adds prepared files not yet in the agent's index.
+        """
+        if not files:
+            return
+        lock = self._locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            index = await self._index(agent_id)
+            for f in files:
+                if f.id in index.meta["files"]:
+                    continue
+                chunks, vectors = await self.prepare(f)
+                await run_in_threadpool(index.add, f.id, chunks, vectors)
+
+    def attach_in_background(self, agent_id: str, files: list[File]):
+        """
+        attach_files off the request path; chat searches the new files'
+        prepared chunks directly until the index holds them.
+        """
+        if not files:
+            return
+        task = asyncio.create_task(self._attach_logged(agent_id, files))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _attach_logged(self, agent_id: str, files: list[File]):
+        try:
+            await self.attach_files(agent_id, files)
+        except Exception:
+            log.exception("attaching %d files to agent %s failed", len(files), agent_id)
+
+    async def search(
+        self, agent_id: str, query: str, k: int | None = None, pending: list[File] = ()
+    ) -> list[Passage]:
+        """
+        Top-k passages from the agent's index and from `pending` files not
+        in it yet (read from their prepared chunks; never embedded here).
+        """
+        k = k or settings.RETRIEVAL_TOP_K
+        sources: list[tuple[list[str], list[str], np.ndarray]] = []
+        indexed: set[str] = set()
+        if agent_id in self._indexes or os.path.exists(self._dir(agent_id)):
+            index = await self._index(agent_id)
+            indexed = set(index.meta["files"])
+            if index.texts:
+                sources.append((index.file_ids, index.texts, index.vectors))
+        for f in pending:
+            if f.id in indexed:
+                continue
+            prepared = await run_in_threadpool(self._load_prepared, f)
+            if prepared and prepared[0]:
+                chunks, vectors = prepared
+                sources.append(([f.id] * len(chunks), chunks, vectors))
+        if not sources:
+            return []
+
+        q = await self.embedder.aembed([query])
+        passages = [
+            Passage(file_ids[i], texts[i], score)
+            for file_ids, texts, vectors in sources
+            for i, score in top_k(q, vectors, k)[0]
+        ]
+        return sorted(passages, key=lambda p: -p.score)[:k]
+
+    def drop(self, agent_id: str):
+        self._indexes.pop(agent_id, None)
+
+    async def delete(self, agent_id: str):
+        """
+        Forgets the agent's index and removes it from disk.
+        """
+        self.drop(agent_id)
+        self._locks.pop(agent_id, None)
+        await run_in_threadpool(shutil.rmtree, self._dir(agent_id), True)
+
+
+def with_passages(system_prompt: str, passages: list[Passage]) -> str:
+    if not passages:
+        return system_prompt
+    body = "\n---\n".join(p.text for p in passages)
+    return f"{system_prompt}[CONTEXT] Relevant excerpts from attached files\n{body}\n\n"
+
+
+retrieval = RetrievalEngine()
@@ -0,0 +1,153 @@
+import html
+import re
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, cast, false, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from app.core.pagination import decode_token, encode_token
+from app.models.agent import Agent
+from app.models.conversation import Conversation
+from app.models.message import Message
+
+# must match the search trigger in migration d5c8a1f7b420 and app/models/message.py
+TS_CONFIG = "english"
+
+# private-use sentinels around matches; swapped for <mark> after the text
+# has been HTML-escaped, so message content can never inject markup
+_START, _STOP = "\ue000", "\ue001"
+HEADLINE_OPTIONS = (
+    f"StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, "
+    'MaxFragments=2, FragmentDelimiter=" … "'
+)
+SNIPPET_CHARS = 160
+
+
+def highlight(text: str) -> str:
+    return html.escape(text).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+# =========================
+# Cursors carry the sort they were issued for, so a page token from a
+# relevance search cannot be replayed against a recency one.
+
+def encode_search_cursor(sort: str, row) -> str:
+    value = row.rank if sort == "relevance" else row.created_at.isoformat()
+    return encode_token([sort, value, row.id])
+
+
+def decode_search_cursor(cursor: str, sort: str) -> tuple:
+    values = decode_token(cursor)
+    try:
+        cursor_sort, value, row_id = values
+        if cursor_sort != sort:
+            raise ValueError(cursor_sort)
+        value = float(value) if sort == "relevance" else datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, row_id
+
+
+def _scope(q, user_id: str, agent_id: str | None, project_id: str | None):
+    q = (
+        q.join(Conversation, Conversation.id == Message.conversation_id)
+        .join(Agent, Agent.id == Conversation.agent_id)
+        .where(Message.user_id == user_id, Agent.deleted_at.is_(None))
+    )
+    if agent_id:
+        q = q.where(Conversation.agent_id == agent_id)
+    if project_id:
+        q = q.where(Agent.project_id == project_id)
+    return q
+
+
+_COLUMNS = (
+    Message.id,
+    Message.conversation_id,
+    Message.role,
+    Message.created_at,
+    Conversation.agent_id,
+    Conversation.title.label("conversation_title"),
+)
+
+
+# =========================
+# Postgres: websearch syntax ("quoted phrases", or, -exclusions) against
+# the (user_id, search_vector) GIN index, so a common term only costs the
+# caller's matches. The page is picked in a subquery so ts_headline, the
+# expensive part, only runs on the rows returned.
+
+def postgres_search(
+    user_id: str,
+    text: str,
+    sort: str,
+    after: tuple | None,
+    limit: int,
+    agent_id: str | None = None,
+    project_id: str | None = None,
+):
+    config = cast(literal(TS_CONFIG), REGCONFIG)
+    tsquery = func.websearch_to_tsquery(config, text)
+    rank = func.ts_rank_cd(Message.search_vector, tsquery)
+
+    q = _scope(select(*_COLUMNS, Message.content, rank.label("rank")), user_id, agent_id, project_id)
+    q = q.where(Message.search_vector.bool_op("@@")(tsquery))
+    sort_key = (rank, Message.id) if sort == "relevance" else (Message.created_at, Message.id)
+    if after:
+        q = q.where(tuple_(*sort_key) < tuple_(*after))
+    page = q.order_by(*(c.desc() for c in sort_key)).limit(limit + 1).subquery()
+
+    outer_key = (page.c.rank, page.c.id) if sort == "relevance" else (page.c.created_at, page.c.id)
+    return (
+        select(
+            *(c for c in page.c if c.name != "content"),
+            func.ts_headline(config, page.c.content, tsquery, HEADLINE_OPTIONS).label("snippet"),
+        )
+        .order_by(*(c.desc() for c in outer_key))
+    )
+
+
+# =========================
+# SQLite (dev/bench only): every word must appear, newest first, no rank.
+
+def _terms(text: str) -> list[str]:
+    return list(dict.fromkeys(w.lower() for w in re.findall(r"\w+", text)))
+
+
+def _like(term: str) -> str:
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def fallback_search(
+    user_id: str,
+    text: str,
+    after: tuple | None,
+    limit: int,
+    agent_id: str | None = None,
+    project_id: str | None = None,
+):
+    q = _scope(select(*_COLUMNS, Message.content), user_id, agent_id, project_id)
+    terms = _terms(text)
+    if not terms:
+        return q.where(false())
+    q = q.where(and_(*(Message.content.ilike(_like(t), escape="\\") for t in terms)))
+    if after:
+        q = q.where(tuple_(Message.created_at, Message.id) < tuple_(*after))
+    return q.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+
+
+def fallback_snippet(content: str, text: str) -> str:
+    """
+    A window around the first match with every term marked, roughly what
+    ts_headline returns.
+    """
+    terms = _terms(text)
+    if not terms:
+        return content[:SNIPPET_CHARS]
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    first = pattern.search(content)
+    start = max(0, first.start() - SNIPPET_CHARS // 3) if first else 0
+    window = content[start:start + SNIPPET_CHARS]
+    marked = pattern.sub(lambda m: f"{_START}{m.group(0)}{_STOP}", window)
+    return ("… " if start else "") + marked + (" …" if start + SNIPPET_CHARS < len(content) else "")
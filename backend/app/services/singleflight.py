@@ -0,0 +1,146 @@
+import asyncio
+from typing import AsyncIterator, Callable
+
+# how long a stream handed out by start() keeps the flight alive before
+# its first iteration; one that is never iterated then stops counting
+HANDOFF_SECONDS = 10.0
+
+
+class _Flight:
+    """
+    One upstream stream shared by every subscriber. Deltas are kept so a
+    subscriber that joins late replays what it missed before going live.
+    """
+
+    def __init__(self, key: str | None):
+        self.key = key
+        self.deltas: list = []
+        # non-text items (token usage) go to one subscriber only, so the
+        # call is accounted once however many requests shared it
+        self.claimed: set[int] = set()
+        self.done = False
+        self.error: BaseException | None = None
+        # waiters in start() and iterating streams
+        self.subscribers = 0
+        # streams returned by start() that have not been iterated yet
+        self.handoffs: set[object] = set()
+        self.ready = asyncio.get_running_loop().create_future()
+        self.wake = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def notify(self):
+        if not self.ready.done():
+            self.ready.set_result(None)
+        wake, self.wake = self.wake, asyncio.Event()
+        wake.set()
+
+
+class Coalescer:
+    """
+    Singleflight for streamed LLM calls: identical in-flight requests share
+    one upstream call and fan its deltas out to all subscribers. The call
+    runs in its own task, so the first client disconnecting does not cut
+    off the others; it is cancelled once every subscriber has left.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def start(self, key: str | None, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Joins (or starts) the flight for `key` and waits for its first delta.
+        Errors before that are raised here; `key=None` never shares.
+        """
+        flight = self._flights.get(key) if key is not None else None
+        if flight is None:
+            flight = _Flight(key)
+            if key is not None:
+                self._flights[key] = flight
+            flight.task = asyncio.create_task(self._pump(flight, open_stream))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        flight.subscribers += 1
+        try:
+            await asyncio.shield(flight.ready)
+        except BaseException:
+            self._leave(flight)
+            raise
+        if flight.error is not None and not flight.deltas:
+            self._leave(flight)
+            raise flight.error
+
+        # the stream counts itself once iterated; until then a ticket holds
+        # the flight open, and expires in case the stream is never used
+        ticket = object()
+        flight.handoffs.add(ticket)
+        asyncio.get_running_loop().call_later(HANDOFF_SECONDS, self._expire, flight, ticket)
+        self._leave(flight)
+        return self._follow(flight, ticket)
+
+    async def _pump(self, flight: _Flight, open_stream):
+        source = open_stream()
+        try:
+            async for delta in source:
+                flight.deltas.append(delta)
+                flight.notify()
+        except BaseException as exc:
+            flight.error = exc
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            await source.aclose()
+            flight.done = True
+            self._forget(flight)
+            flight.notify()
+
+    async def _follow(self, flight: _Flight, ticket: object):
+        flight.subscribers += 1
+        flight.handoffs.discard(ticket)
+        i = 0
+        try:
+            while True:
+                if i < len(flight.deltas):
+                    item = flight.deltas[i]
+                    i += 1
+                    if not isinstance(item, str):
+                        if i in flight.claimed:
+                            continue
+                        flight.claimed.add(i)
+                    yield item
+                elif flight.error is not None:
+                    raise flight.error
+                elif flight.done:
+                    return
+                else:
+                    await flight.wake.wait()
+        finally:
+            self._leave(flight)
+
+    def _expire(self, flight: _Flight, ticket: object):
+        if ticket in flight.handoffs:
+            flight.handoffs.discard(ticket)
+            self._reap(flight)
+
+    def _leave(self, flight: _Flight):
+        flight.subscribers -= 1
+        self._reap(flight)
+
+    def _reap(self, flight: _Flight):
+        if flight.subscribers == 0 and not flight.handoffs and not flight.done:
+            # nobody is listening any more: stop the upstream call
+            self._forget(flight)
+            flight.task.cancel()
+
+    def _forget(self, flight: _Flight):
+        if flight.key is not None and self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def snapshot(self) -> dict:
+        return {"in_flight": len(self._flights), "started": self.started, "coalesced": self.coalesced}
+
+
+coalescer = Coalescer()
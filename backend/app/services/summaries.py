@@ -0,0 +1,100 @@
+import logging
+from sqlalchemy import select, func, update
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.admission import admission
+from app.services.context import after_cursor, estimate_tokens
+from app.services.llm_router import llm_router
+
+log = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the existing summary with the new messages. Keep facts, decisions, names, "
+    "open questions and user preferences; drop pleasantries. Reply with the summary only."
+)
+
+# conversations with a summarization already in flight on this worker
+_running: set[str] = set()
+
+
+def with_summary(system_prompt: str, summary: str) -> str:
+    if not summary:
+        return system_prompt
+    return f"{system_prompt}[SUMMARY] Earlier in this conversation\n{summary}\n\n"
+
+
+def summary_cursor(conv: Conversation) -> tuple | None:
+    if conv.summary_message_id is None:
+        return None
+    return (conv.summary_message_at, conv.summary_message_id)
+
+
+async def maybe_summarize(conversation_id: str):
+    """
+    Folds older messages into the conversation summary once the unsummarized
+    tail grows past the trigger. Incremental: only messages after the current
+    summary cursor are sent, together with the previous summary.
+    """
+    if not settings.SUMMARY_ENABLED or conversation_id in _running:
+        return
+    _running.add(conversation_id)
+    try:
+        await _summarize(conversation_id)
+    except Exception:
+        log.warning("summarization failed for conversation %s", conversation_id, exc_info=True)
+    finally:
+        _running.discard(conversation_id)
+
+
+async def _summarize(conversation_id: str):
+    # read, then let go of the connection: the model call can take seconds
+    async with AsyncSessionLocal() as db:
+        conv = await db.get(Conversation, conversation_id)
+        if conv is None:
+            return
+        cursor = summary_cursor(conv)
+        user_id, previous = conv.user_id, conv.summary
+
+        unsummarized = select(Message).where(Message.conversation_id == conversation_id)
+        if cursor is not None:
+            unsummarized = unsummarized.where(after_cursor(*cursor))
+
+        pending = await db.scalar(select(func.count()).select_from(unsummarized.subquery()))
+        if pending <= settings.SUMMARY_TRIGGER_MESSAGES:
+            return
+
+        fold = min(pending - settings.SUMMARY_KEEP_RECENT, settings.SUMMARY_BATCH_MAX)
+        rows = (
+            await db.execute(
+                unsummarized.with_only_columns(Message.id, Message.role, Message.content, Message.created_at)
+                .order_by(Message.created_at.asc(), Message.id.asc())
+                .limit(fold)
+            )
+        ).all()
+    if not rows:
+        return
+
+    transcript = "\n".join(f"{m.role}: {m.content}" for m in rows)
+    prompt = f"Existing summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"
+    # summaries queue for the model like the user's chats do
+    provider, model = settings.SUMMARY_PROVIDER, settings.SUMMARY_MODEL
+    async with admission.slot(provider, model, user_id, estimate_tokens(prompt)):
+        summary, _ = await llm_router.respond(
+            [{"role": "user", "content": prompt}], SUMMARY_INSTRUCTIONS, model, provider
+        )
+
+    last = rows[-1]
+    # only apply if no other worker moved the cursor meanwhile
+    stmt = update(Conversation).where(Conversation.id == conversation_id)
+    if cursor is None:
+        stmt = stmt.where(Conversation.summary_message_id.is_(None))
+    else:
+        stmt = stmt.where(Conversation.summary_message_id == cursor[1])
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            stmt.values(summary=summary, summary_message_id=last.id, summary_message_at=last.created_at)
+        )
+        await db.commit()
@@ -0,0 +1,122 @@
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from starlette.datastructures import FormData, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+# bytes of uploads being received or handed upstream per user on this worker
+_inflight: dict[str, int] = defaultdict(int)
+
+
+def _release(user_id: str, n: int):
+    _inflight[user_id] -= n
+    if _inflight[user_id] <= 0:
+        del _inflight[user_id]
+
+
+@dataclass
+class ReceivedUpload:
+    file: UploadFile
+    size: int
+    seconds: float
+    user_id: str = ""
+    # counted against the user's in-flight limit until close(), so the
+    # limit also covers the upstream upload that follows
+    held: int = 0
+
+    @property
+    def throughput_mbps(self) -> float:
+        return round(self.size * 8 / 1_000_000 / self.seconds, 2) if self.seconds > 0 else 0.0
+
+    async def close(self):
+        await self.file.close()
+        if self.held:
+            _release(self.user_id, self.held)
+            self.held = 0
+
+
+class _Parser(MultiPartParser):
+    """
+    Closes the files spooled so far on any error (limit exceeded, malformed
+    body, client gone), not only on the MultiPartException the base parser
+    cleans up after.
+    """
+
+    async def parse(self) -> FormData:
+        try:
+            return await super().parse()
+        except BaseException:
+            for file in self._files_to_close_on_error:
+                file.close()
+            raise
+
+
+def _too_large(detail: str):
+    return HTTPException(status_code=413, detail=detail)
+
+
+async def receive_upload(request: Request, user_id: str, field: str = "file") -> ReceivedUpload:
+    """
+    Parses a multipart upload straight from the request stream into a
+    spooled temp file (memory stays bounded regardless of size), enforcing
+    UPLOAD_MAX_FILE_BYTES and the per-user in-flight limit while reading.
+    The received bytes stay counted against that limit until the returned
+    upload is closed.
+    """
+    max_bytes = settings.UPLOAD_MAX_FILE_BYTES
+
+    # reject obviously oversized requests before reading anything
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + 64 * 1024:
+        raise _too_large(f"File exceeds {max_bytes} bytes")
+
+    started = time.perf_counter()
+    received = 0
+
+    async def limited_stream():
+        nonlocal received
+        async for chunk in request.stream():
+            received += len(chunk)
+            _inflight[user_id] += len(chunk)
+            if received > max_bytes + 64 * 1024:
+                raise _too_large(f"File exceeds {max_bytes} bytes")
+            if _inflight[user_id] > settings.UPLOAD_MAX_USER_INFLIGHT_BYTES:
+                raise _too_large("Too much upload data in flight for this user")
+            yield chunk
+
+    try:
+        form = await _Parser(request.headers, limited_stream(), max_files=1, max_fields=10).parse()
+    except (MultiPartException, MultipartParseError) as exc:
+        _release(user_id, received)
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {exc}")
+    except BaseException:
+        _release(user_id, received)
+        raise
+
+    file = form.get(field)
+    error = None
+    if not isinstance(file, UploadFile):
+        error = HTTPException(status_code=422, detail=f"Missing '{field}' file field")
+    elif file.size is not None and file.size > max_bytes:
+        error = _too_large(f"File exceeds {max_bytes} bytes")
+    if error is not None:
+        await form.close()
+        _release(user_id, received)
+        raise error
+
+    upload = ReceivedUpload(
+        file=file, size=file.size or 0, seconds=time.perf_counter() - started, user_id=user_id, held=received
+    )
+    log.info(
+        "received upload %s: %d bytes in %.2fs (%.2f Mbit/s)",
+        file.filename, upload.size, upload.seconds, upload.throughput_mbps,
+    )
+    return upload
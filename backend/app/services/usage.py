@@ -0,0 +1,121 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from app.models.usage import UsageHourly
+
+GRAIN = ("hour", "user_id", "project_id", "agent_id", "model")
+COUNTERS = ("requests", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms")
+GROUPS = {
+    "project": UsageHourly.project_id,
+    "agent": UsageHourly.agent_id,
+    "model": UsageHourly.model,
+}
+
+
+def hour_bucket(ts: datetime) -> datetime:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class Rollup:
+    """
+    Accumulates usage per grain key in memory so a batch of messages
+    becomes one upsert per (hour, user, project, agent, model).
+    """
+
+    def __init__(self):
+        self.rows: dict[tuple, dict] = {}
+
+    def add(self, ts: datetime, user_id: str, project_id: str, agent_id: str, model: str, **counters):
+        key = (hour_bucket(ts), user_id, project_id, agent_id, model)
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = dict(zip(GRAIN, key), **{c: 0 for c in COUNTERS})
+        for name, value in counters.items():
+            row[name] += value or 0
+
+    def __bool__(self) -> bool:
+        return bool(self.rows)
+
+    def values(self) -> list[dict]:
+        # fixed order keeps concurrent upserts from locking rows in different orders
+        keys = sorted(self.rows, key=lambda k: (k[0].isoformat(), *k[1:]))
+        return [{"id": str(uuid.uuid4()), **self.rows[k]} for k in keys]
+
+
+def upsert_statement(dialect: str, replace: bool = False):
+    """
+    INSERT ... ON CONFLICT (grain) DO UPDATE SET counter = counter + excluded.counter,
+    or = excluded.counter with replace=True (recomputed totals, not increments).
+    """
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(UsageHourly)
+    if replace:
+        set_ = {c: getattr(stmt.excluded, c) for c in COUNTERS}
+    else:
+        set_ = {c: getattr(UsageHourly, c) + getattr(stmt.excluded, c) for c in COUNTERS}
+    return stmt.on_conflict_do_update(index_elements=list(GRAIN), set_=set_)
+
+
+def usage_query(
+    user_id: str,
+    since: datetime,
+    until: datetime,
+    group_by: str | None = None,
+    project_id: str | None = None,
+    agent_id: str | None = None,
+    model: str | None = None,
+):
+    group_col = GROUPS.get(group_by)
+    cols = [UsageHourly.hour]
+    if group_col is not None:
+        cols.append(group_col.label("key"))
+    q = select(*cols, *(func.sum(getattr(UsageHourly, c)).label(c) for c in COUNTERS)).where(
+        UsageHourly.user_id == user_id,
+        UsageHourly.hour >= hour_bucket(since),
+        UsageHourly.hour < until,
+    )
+    if project_id:
+        q = q.where(UsageHourly.project_id == project_id)
+    if agent_id:
+        q = q.where(UsageHourly.agent_id == agent_id)
+    if model:
+        q = q.where(UsageHourly.model == model)
+    group = [UsageHourly.hour] + ([group_col] if group_col is not None else [])
+    return q.group_by(*group).order_by(UsageHourly.hour)
+
+
+def fold(rows, granularity: str) -> list[dict]:
+    """
+    Turns hourly SQL rows into buckets; days are folded here so the query
+    stays portable across databases.
+    """
+    buckets: dict[tuple, dict] = {}
+    for r in rows:
+        start = hour_bucket(r.hour)
+        if granularity == "day":
+            start = start.replace(hour=0)
+        key = getattr(r, "key", None)
+        b = buckets.get((start, key))
+        if b is None:
+            b = buckets[(start, key)] = {"start": start, "key": key, **{c: 0 for c in COUNTERS}}
+        for c in COUNTERS:
+            b[c] += getattr(r, c) or 0
+    out = []
+    for b in buckets.values():
+        latency = b.pop("latency_ms")
+        b["avg_latency_ms"] = round(latency / b["requests"], 1) if b["requests"] else None
+        out.append(b)
+    return out
+
+
+def default_window(granularity: str) -> tuple[datetime, datetime]:
+    now = datetime.now(timezone.utc)
+    span = timedelta(days=30) if granularity == "day" else timedelta(hours=24)
+    return now - span, now
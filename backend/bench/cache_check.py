@@ -0,0 +1,73 @@
+"""
+Checks the response cache's near-duplicate matching for first turns.
+
+Questions that differ only in casing, punctuation or spacing share an
+answer; questions that differ in any word, however similar they read,
+must miss and go upstream.
+
+    python -m bench.cache_check
+
+Exits non-zero on the first failed check. Run from backend/.
+"""
+import os
+import sys
+
+# settings are read at import time; the cache needs no database
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "cache-check")
+
+from app.services.response_cache import ResponseCache  # noqa: E402
+
+AGENT, MODEL, PROMPT = "agent-1", "gpt-4o-mini", "You are a helpful assistant."
+
+SAME = [
+    ("What is the price of the pro plan?", "what is the price of the pro plan"),
+    ("Are you open on Sunday?", "  are you OPEN on sunday  ?!"),
+]
+
+# pairs the old cosine threshold (0.82 on the hashing embedder) treated as one question
+NEAR_MISSES = [
+    ("What is the price of the pro plan?", "What is the price of the basic plan?"),
+    ("Are you open on Sunday?", "Are you open on Monday?"),
+    ("Convert 100 USD to EUR", "Convert 100 EUR to USD"),
+    ("How do I cancel my subscription?", "How do I renew my subscription?"),
+]
+
+
+def check(ok: bool, label: str):
+    print(f"{'ok' if ok else 'FAIL':4}  {label}")
+    if not ok:
+        sys.exit(1)
+
+
+def _turn(text: str) -> list[dict]:
+    return [{"role": "user", "content": text}]
+
+
+def main():
+    for stored, asked in SAME:
+        cache = ResponseCache(maxsize=100, ttl=3600)
+        cache.store(AGENT, MODEL, PROMPT, _turn(stored), "answer", semantic=True)
+        hit = cache.lookup(AGENT, MODEL, PROMPT, _turn(asked), semantic=True)
+        check(hit == "answer", f"hit: {stored!r} ~ {asked!r}")
+
+    for stored, asked in NEAR_MISSES:
+        cache = ResponseCache(maxsize=100, ttl=3600)
+        cache.store(AGENT, MODEL, PROMPT, _turn(stored), "answer", semantic=True)
+        hit = cache.lookup(AGENT, MODEL, PROMPT, _turn(asked), semantic=True)
+        check(hit is None, f"miss: {stored!r} vs {asked!r}")
+
+    cache = ResponseCache(maxsize=100, ttl=3600)
+    cache.store(AGENT, MODEL, PROMPT, _turn(SAME[0][0]), "answer", semantic=True)
+    check(
+        cache.lookup("agent-2", MODEL, PROMPT, _turn(SAME[0][1]), semantic=True) is None,
+        "another agent never gets the answer",
+    )
+    check(
+        cache.lookup(AGENT, MODEL, PROMPT, _turn(SAME[0][1])) is None,
+        "exact-key only when semantic matching is off",
+    )
+
+
+if __name__ == "__main__":
+    main()
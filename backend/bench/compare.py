@@ -0,0 +1,81 @@
+"""
+Compares two benchmark reports written by bench.run.
+
+    python -m bench.compare base.json head.json [--threshold 0.10]
+
+Prints p50/p95/p99 latency, throughput and chat TTFT for each
+(workload, concurrency) pair present in both reports. Exits with status 1
+when p95 latency, p95 TTFT or throughput regressed by more than the
+threshold, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def _load(path: str) -> tuple[dict, dict]:
+    with open(path) as fh:
+        report = json.load(fh)
+    return report.get("meta", {}), {(r["workload"], r["concurrency"]): r for r in report["results"]}
+
+
+def _get(result: dict, section: str, key: str):
+    return (result.get(section) or {}).get(key)
+
+
+def _change(base, head) -> float | None:
+    if base in (None, 0) or head is None:
+        return None
+    return (head - base) / base
+
+
+def _fmt(base, head) -> str:
+    change = _change(base, head)
+    if change is None:
+        return f"{head!s:>9}"
+    return f"{head!s:>9} ({change:+.0%})"
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Compare two benchmark reports")
+    p.add_argument("base")
+    p.add_argument("head")
+    p.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    args = p.parse_args(argv)
+
+    base_meta, base = _load(args.base)
+    head_meta, head = _load(args.head)
+    print(f"base {base_meta.get('revision')}  ->  head {head_meta.get('revision')}")
+    print(f"{'workload':>8} {'c':>4} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'rps':>17} {'ttft p95':>17}")
+
+    regressions = []
+    for key in sorted(set(base) & set(head)):
+        b, h = base[key], head[key]
+        row = [
+            _fmt(_get(b, "latency_ms", "p50"), _get(h, "latency_ms", "p50")),
+            _fmt(_get(b, "latency_ms", "p95"), _get(h, "latency_ms", "p95")),
+            _fmt(_get(b, "latency_ms", "p99"), _get(h, "latency_ms", "p99")),
+            _fmt(b.get("throughput_rps"), h.get("throughput_rps")),
+            _fmt(_get(b, "ttft_ms", "p95"), _get(h, "ttft_ms", "p95")),
+        ]
+        print(f"{key[0]:>8} {key[1]:>4} " + " ".join(f"{c:>17}" for c in row))
+
+        checks = (
+            ("p95 latency", _change(_get(b, "latency_ms", "p95"), _get(h, "latency_ms", "p95"))),
+            ("p95 ttft", _change(_get(b, "ttft_ms", "p95"), _get(h, "ttft_ms", "p95"))),
+            # lower throughput is the regression
+            ("throughput", -(_change(b.get("throughput_rps"), h.get("throughput_rps")) or 0)),
+        )
+        for name, change in checks:
+            if change is not None and change > args.threshold:
+                regressions.append(f"{key[0]} c={key[1]}: {name} {change:+.0%}")
+
+    if regressions:
+        print("\nregressions beyond threshold:")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
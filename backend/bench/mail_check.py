@@ -0,0 +1,154 @@
+"""
+End-to-end check of outbound email against a local SMTP stand-in.
+
+Starts an aiosmtpd server on a free port, points the app's SMTP settings at
+it and drives the mail queue worker through a throwaway SQLite database:
+a batch goes out over one authenticated connection, a dropped connection is
+re-established, and an unreachable server leaves mail pending with backoff.
+
+    pip install aiosmtpd
+    python -m bench.mail_check
+
+Exits non-zero on the first failed check. Run from backend/.
+"""
+import asyncio
+import logging
+import os
+import socket
+import sys
+import tempfile
+
+USERNAME, PASSWORD = "mailer", "mailer-password"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = _free_port()
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="mail-check-"), "mail.db")
+
+# settings are read at import time, so the environment goes in first
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{DB_PATH}",
+    "SECRET_KEY": "mail-check",
+    "SMTP_SERVER": "127.0.0.1",
+    "SMTP_PORT": str(PORT),
+    "SMTP_STARTTLS": "false",
+    "SMTP_SSL_TLS": "false",
+    "SMTP_USERNAME": USERNAME,
+    "SMTP_PASSWORD": PASSWORD,
+    "SMTP_FROM": "noreply@example.com",
+})
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.models.outbound_email import OutboundEmail  # noqa: E402
+from app.services.mail_queue import MailQueueWorker, enqueue_email  # noqa: E402
+
+
+# =========================
+# SMTP STAND-IN
+# =========================
+
+class _Inbox:
+    def __init__(self):
+        self.messages: list = []
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def _authenticate(server, session, envelope, mechanism, auth_data):
+    ok = auth_data.login.decode() == USERNAME and auth_data.password.decode() == PASSWORD
+    return AuthResult(success=ok)
+
+
+def _controller(inbox: _Inbox) -> Controller:
+    return Controller(
+        inbox,
+        hostname="127.0.0.1",
+        port=PORT,
+        authenticator=_authenticate,
+        auth_require_tls=False,
+    )
+
+
+# =========================
+# CHECKS
+# =========================
+
+def check(ok: bool, label: str):
+    print(f"{'ok' if ok else 'FAIL':4}  {label}")
+    if not ok:
+        sys.exit(1)
+
+
+async def _enqueue(n: int, tag: str):
+    async with AsyncSessionLocal() as db:
+        for i in range(n):
+            enqueue_email(db, subject=f"{tag} {i}", recipients=[f"user{i}@example.com"], body=f"{tag} body {i}")
+        await db.commit()
+
+
+async def _rows(tag: str) -> list[OutboundEmail]:
+    async with AsyncSessionLocal() as db:
+        return list((await db.scalars(select(OutboundEmail).where(OutboundEmail.subject.like(f"{tag} %")))).all())
+
+
+async def main():
+    Base.metadata.create_all(engine)
+    worker = MailQueueWorker()
+    inbox = _Inbox()
+    server = _controller(inbox)
+    server.start()
+    try:
+        await _enqueue(3, "batch")
+        sent = await worker.drain_once()
+        rows = await _rows("batch")
+        check(sent == 3 and all(r.status == "sent" for r in rows), "batch is sent and marked sent")
+        check(len(inbox.messages) == 3 and inbox.sessions == 1, "batch shares one authenticated connection")
+        check(
+            inbox.messages[0].rcpt_tos == ["user0@example.com"] and b"batch body 0" in inbox.messages[0].content,
+            "recipient and body arrive intact",
+        )
+
+        # the server goes away between batches; the kept connection is dead
+        server.stop()
+        server = _controller(inbox)
+        server.start()
+        await _enqueue(1, "reconnect")
+        await worker.drain_once()
+        rows = await _rows("reconnect")
+        check(rows[0].status == "sent" and inbox.sessions == 2, "dropped connection is re-established")
+    finally:
+        server.stop()
+        await worker.stop()
+
+    # nothing listening: the mail stays queued with a backoff
+    logging.getLogger("app.services.mail_queue").setLevel(logging.ERROR)
+    await _enqueue(1, "offline")
+    await worker.drain_once()
+    rows = await _rows("offline")
+    check(
+        rows[0].status == "pending" and rows[0].attempts == 1 and rows[0].last_error,
+        "unreachable server leaves mail pending for a retry",
+    )
+    await worker.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Mock OpenAI Responses API for benchmarks.
+
+    MOCK_TTFT_MS=300 MOCK_TOKEN_MS=15 MOCK_TOKENS=60 \
+        python -m uvicorn bench.mock_llm:app --port 8900
+
+Serves POST /v1/responses (streamed and plain), /v1/embeddings and
+/v1/files with the same shapes the app parses. Latency knobs (env):
+
+    MOCK_TTFT_MS      delay before the first delta        (default 300)
+    MOCK_TOKEN_MS     delay between deltas                (default 15)
+    MOCK_TOKENS       deltas per answer                   (default 60)
+    MOCK_JITTER       +/- fraction applied to each delay  (default 0.2)
+    MOCK_ERROR_RATE   share of requests answered with 503 (default 0)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+TTFT_MS = float(os.getenv("MOCK_TTFT_MS", "300"))
+TOKEN_MS = float(os.getenv("MOCK_TOKEN_MS", "15"))
+TOKENS = int(os.getenv("MOCK_TOKENS", "60"))
+JITTER = float(os.getenv("MOCK_JITTER", "0.2"))
+ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0"))
+
+WORDS = "the quick brown fox jumps over a lazy dog while benchmarks measure every step".split()
+
+
+def _delay(ms: float) -> float:
+    return max(0.0, ms * random.uniform(1 - JITTER, 1 + JITTER)) / 1000
+
+
+def _usage(body: dict) -> dict:
+    prompt = json.dumps(body.get("input", ""))
+    return {
+        "input_tokens": len(prompt) // 4,
+        "output_tokens": TOKENS,
+        "input_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def responses(request: Request):
+    body = await request.json()
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse({"error": {"message": "overloaded"}}, status_code=503, headers={"Retry-After": "1"})
+
+    words = [random.choice(WORDS) for _ in range(TOKENS)]
+    if not body.get("stream"):
+        await asyncio.sleep(_delay(TTFT_MS))
+        return JSONResponse({"id": f"resp_{uuid.uuid4().hex}", "output_text": " ".join(words), "usage": _usage(body)})
+
+    async def events():
+        await asyncio.sleep(_delay(TTFT_MS))
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(_delay(TOKEN_MS))
+            yield _sse({"type": "response.output_text.delta", "delta": word if i == 0 else " " + word})
+        yield _sse({"type": "response.completed", "response": {"usage": _usage(body)}})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    dim = body.get("dimensions", 256)
+    data = []
+    for i, text in enumerate(inputs):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        rng = random.Random(seed)
+        data.append({"index": i, "embedding": [rng.uniform(-1, 1) for _ in range(dim)]})
+    return JSONResponse({"data": data})
+
+
+async def files(request: Request):
+    await request.body()
+    return JSONResponse({"id": f"file-{uuid.uuid4().hex[:24]}", "object": "file"})
+
+
+async def health(request: Request):
+    return JSONResponse({"ok": True})
+
+
+app = Starlette(routes=[
+    Route("/v1/responses", responses, methods=["POST"]),
+    Route("/v1/embeddings", embeddings, methods=["POST"]),
+    Route("/v1/files", files, methods=["POST"]),
+    Route("/health", health),
+])
@@ -105,6 +105,7 @@ export default function Chat({
 
       const decoder = new TextDecoder();
       let buffer = "";
+      let streaming = false;
 
       while (true) {
         const { done, value } = await reader.read();
@@ -120,9 +121,25 @@ export default function Chat({
           const data = JSON.parse(jsonStr);
 
           if (data.conversation_id) setConversationId(data.conversation_id);
+          if (data.delta) {
+            const first = !streaming;
+            streaming = true;
+            setMessages((m) => {
+              if (first) return [...m, { role: "assistant", content: data.delta }];
+              const last = m[m.length - 1];
+              return [...m.slice(0, -1), { ...last, content: last.content + data.delta }];
+            });
+          }
           if (data.text) {
             setMessages((m) => [...m, { role: "assistant", content: data.text }]);
           }
+          if (data.error) {
+            // the answer broke off mid-stream
+            setMessages((m) => [
+              ...m,
+              { role: "assistant", content: `⚠️ ${data.error}. The answer above is incomplete.` },
+            ]);
+          }
         }
       }
     } catch (e) {
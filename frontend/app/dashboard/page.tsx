@@ -12,7 +12,7 @@ import Modal from "@/components/Modal";
 import SidebarItem from "@/components/SidebarItem";
 import TextInput from "@/components/TextInput";
 import PrimaryButton from "@/components/PrimaryButton";
-import { apiFetch } from "@/lib/api";
+import { apiFetch, apiFetchAll } from "@/lib/api";
 
 type Project = {
   id: string;
@@ -189,8 +189,7 @@ function EditIcon({ className = "" }) {
     setErr(null);
     setLoadingProjects(true);
     try {
-      const res = await apiFetch("/projects", { method: "GET" });
-      const data = await res.json();
+      const data = await apiFetchAll("/projects");
       setProjects(data);
 
       // auto-select first project
@@ -211,8 +210,7 @@ function EditIcon({ className = "" }) {
     setErr(null);
     setLoadingAgents(true);
     try {
-      const res = await apiFetch(`/projects/${projectId}/agents`, { method: "GET" });
-      const data = await res.json();
+      const data = await apiFetchAll(`/projects/${projectId}/agents`);
       setAgents(data);
     } catch (e: any) {
       setErr(e.message || "Failed to load agents");
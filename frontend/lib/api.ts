@@ -39,3 +39,21 @@ export async function updateMe(data: { name: string; email: string }) {
   if (!res.ok) throw new Error("Failed to update user");
   return res.json();
 }
+
+// List endpoints return one page at a time; follow X-Next-Cursor to the end.
+export async function apiFetchAll(path: string, options: RequestInit = {}) {
+  const rows: any[] = [];
+  const sep = path.includes("?") ? "&" : "?";
+  let cursor: string | null = null;
+
+  do {
+    // 200 is the API's page size cap
+    let url = `${path}${sep}limit=200`;
+    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+    const res: Response = await apiFetch(url, { ...options, method: "GET" });
+    rows.push(...(await res.json()));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return rows;
+}